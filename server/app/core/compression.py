@@ -0,0 +1,171 @@
+import gzip
+import zlib
+from anyio import to_thread
+from fastapi import Request, Response
+from starlette.datastructures import Headers, MutableHeaders
+from app.core.config import COMPRESSION_MIN_SIZE, GZIP_LEVEL, BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:  # optional; only gzip is offered without it
+    brotli = None
+
+# Preferred first when the client weighs them equally
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+# Compressing bigger bodies than this is moved off the event loop
+THREADPOOL_THRESHOLD = 64 * 1024
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """The best encoding we offer that Accept-Encoding allows, or None for identity."""
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    wildcard = weights.get("*", 0.0)
+    best = max(ENCODINGS, key=lambda e: weights.get(e, wildcard))
+    return best if weights.get(best, wildcard) > 0 else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0 so the same body always compresses to the same bytes
+    return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+
+def compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "")
+    return "content-encoding" not in headers and (content_type.startswith("text/") or "json" in content_type)
+
+
+def weak_etag(etag: str) -> str:
+    # The compressed bytes differ from the identity body, so the validator can only be weak
+    return etag if etag.startswith("W/") else f"W/{etag}"
+
+
+class _StreamCompressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def write(self, data: bytes, final: bool) -> bytes:
+        if self._brotli is not None:
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        # Flush each chunk so streamed responses reach the client as they're produced
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing text and JSON responses of at least `minimum_size` bytes.
+
+    Responses that already carry a Content-Encoding (see `payload_response`) pass through.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        stream = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, stream, passthrough
+            if message["type"] == "http.response.start":
+                if message["status"] in (204, 304) or not compressible(Headers(raw=message["headers"])):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Held back until the first body chunk shows whether it's worth compressing
+                    start = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if stream is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                stream = _StreamCompressor(encoding)
+                headers = MutableHeaders(scope=start)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "etag" in headers:
+                    headers["ETag"] = weak_etag(headers["etag"])
+                body = stream.write(body, not more_body)
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(body))
+                await send(start)
+            else:
+                body = stream.write(body, not more_body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class Payload:
+    """A serialized response body kept with its compressed encodings, each made once.
+
+    Cache one of these next to a cached result and every hit is served without
+    re-serializing or recompressing.
+    """
+
+    __slots__ = ("body", "_encoded")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self._encoded: dict[str, bytes] = {}
+
+    async def encoded(self, encoding: str) -> bytes:
+        data = self._encoded.get(encoding)
+        if data is None:
+            if len(self.body) >= THREADPOOL_THRESHOLD:
+                data = await to_thread.run_sync(compress, self.body, encoding)
+            else:
+                data = compress(self.body, encoding)
+            self._encoded[encoding] = data
+        return data
+
+
+async def payload_response(
+    request: Request, payload: Payload, headers: dict | None = None, media_type: str = "application/json"
+) -> Response:
+    """Response for a cached payload, in the best encoding the client accepts."""
+    headers = dict(headers or {})
+    encoding = negotiate(request.headers.get("accept-encoding", ""))
+    if encoding is None or len(payload.body) < COMPRESSION_MIN_SIZE:
+        return Response(payload.body, media_type=media_type, headers=headers)
+
+    headers["Content-Encoding"] = encoding
+    headers["Vary"] = "Accept-Encoding"
+    if "ETag" in headers:
+        headers["ETag"] = weak_etag(headers["ETag"])
+    return Response(await payload.encoded(encoding), media_type=media_type, headers=headers)
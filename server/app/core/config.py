@@ -7,3 +7,84 @@ API_KEY = os.getenv("API_KEY")
 SECRET_KEY = os.getenv("SECRET_KEY", "your_secret_key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+def _flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+# Database
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./database.db")
+# Async driver URL; derived from DATABASE_URL (sqlite -> aiosqlite, postgresql -> asyncpg) when unset
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", "")
+# Use the async SQLAlchemy engine instead of sync sessions in the threadpool
+DATABASE_ASYNC = _flag("DATABASE_ASYNC", "false")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_PRE_PING = _flag("DB_POOL_PRE_PING", "true")
+# Milliseconds; on SQLite this bounds how long a statement waits for a lock (busy_timeout)
+DB_STATEMENT_TIMEOUT = int(os.getenv("DB_STATEMENT_TIMEOUT", "5000"))
+# How long (ms) a starting worker waits for another one to finish migrating the schema
+DB_SCHEMA_LOCK_TIMEOUT = int(os.getenv("DB_SCHEMA_LOCK_TIMEOUT", "120000"))
+
+# SQLite pragmas applied to every new connection
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Negative values are KiB, per SQLite's convention
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+
+# Geoapify search cache
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1024"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "900"))
+# Size of the lat/long grid cell (degrees) that nearby searches share; 0.01 is roughly 1 km
+SEARCH_CACHE_CELL = float(os.getenv("SEARCH_CACHE_CELL", "0.01"))
+# Path to a SQLite file shared by all workers; leave empty to keep the cache in-process only
+SEARCH_CACHE_DB = os.getenv("SEARCH_CACHE_DB", "")
+
+# Background search prefetch of the 8 cells around each search; off unless SEARCH_PREFETCH=true
+SEARCH_PREFETCH = _flag("SEARCH_PREFETCH", "false")
+# Upstream fetches per minute that prefetching may spend, per client and across the worker
+SEARCH_PREFETCH_CLIENT_BUDGET = float(os.getenv("SEARCH_PREFETCH_CLIENT_BUDGET", "24"))
+SEARCH_PREFETCH_GLOBAL_BUDGET = float(os.getenv("SEARCH_PREFETCH_GLOBAL_BUDGET", "600"))
+SEARCH_PREFETCH_CONCURRENCY = int(os.getenv("SEARCH_PREFETCH_CONCURRENCY", "4"))
+
+# Geoapify autocomplete; completions are cached per (area, prefix)
+AUTOCOMPLETE_LIMIT = int(os.getenv("AUTOCOMPLETE_LIMIT", "8"))
+AUTOCOMPLETE_CACHE_SIZE = int(os.getenv("AUTOCOMPLETE_CACHE_SIZE", "8192"))
+AUTOCOMPLETE_CACHE_TTL = float(os.getenv("AUTOCOMPLETE_CACHE_TTL", "900"))
+# Autocomplete is biased less tightly than search, so areas are coarser; 0.05 is roughly 5 km
+AUTOCOMPLETE_CELL = float(os.getenv("AUTOCOMPLETE_CELL", "0.05"))
+
+# Geoapify place details, stored per place. Older than PLACE_DETAILS_TTL seconds they're still
+# served, but refreshed in the background; older than TTL + MAX_STALE they're refetched first.
+PLACE_DETAILS_TTL = float(os.getenv("PLACE_DETAILS_TTL", str(7 * 24 * 3600)))
+PLACE_DETAILS_MAX_STALE = float(os.getenv("PLACE_DETAILS_MAX_STALE", str(30 * 24 * 3600)))
+# Most places fetched from Geoapify per request (and per background refresh), and how many at once
+PLACE_DETAILS_BATCH_SIZE = int(os.getenv("PLACE_DETAILS_BATCH_SIZE", "100"))
+PLACE_DETAILS_CONCURRENCY = int(os.getenv("PLACE_DETAILS_CONCURRENCY", "8"))
+
+# Geoapify HTTP client; point GEOAPIFY_BASE_URL at benchmarks/geoapify_stub.py for load tests
+GEOAPIFY_BASE_URL = os.getenv("GEOAPIFY_BASE_URL", "https://api.geoapify.com").rstrip("/")
+GEOAPIFY_TIMEOUT = float(os.getenv("GEOAPIFY_TIMEOUT", "10"))
+GEOAPIFY_MAX_CONNECTIONS = int(os.getenv("GEOAPIFY_MAX_CONNECTIONS", "20"))
+
+# Response compression; gzip always, brotli when the brotli package is installed
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+# Serialized (and compressed) list pages, keyed by ETag, so a hot list isn't rebuilt per request
+LIST_PAYLOAD_CACHE_SIZE = int(os.getenv("LIST_PAYLOAD_CACHE_SIZE", "128"))
+LIST_PAYLOAD_CACHE_TTL = float(os.getenv("LIST_PAYLOAD_CACHE_TTL", "600"))
+
+# Authenticated principal cache
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "4096"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+
+# Password hashing
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(os.cpu_count() or 1, 4))))
+# Hash/verify jobs allowed to queue before new ones are rejected with 503
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+# Server-side marker clustering, cached per (list version, zoom, tile)
+CLUSTER_CACHE_SIZE = int(os.getenv("CLUSTER_CACHE_SIZE", "4096"))
+CLUSTER_CACHE_TTL = float(os.getenv("CLUSTER_CACHE_TTL", "3600"))
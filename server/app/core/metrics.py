@@ -0,0 +1,220 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from sqlalchemy import event
+
+# Prometheus' default latency buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key: tuple, value) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; each label set keeps per-bucket counts, a sum and a count."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # Per-bucket counts (last slot is +Inf), then sum
+                series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *labels) -> int:
+        series = self._values.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def sum(self, *labels) -> float:
+        series = self._values.get(labels)
+        return series[-1] if series else 0.0
+
+    def _render_sample(self, key: tuple, series) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, n in zip((*self.buckets, float("inf")), series[:-1]):
+            cumulative += n
+            le = f'le="{_format_value(float(bound))}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(series[-1])}")
+        lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+REGISTRY: list[_Metric] = []
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+http_requests = Counter("http_requests_total", "HTTP requests handled.", ("method", "route", "status"))
+http_latency = Histogram(
+    "http_request_duration_seconds", "Time from request start to the end of the response body.", ("method", "route")
+)
+# The route is only known once routing has run, so in-flight is tracked per method
+http_in_flight = Gauge("http_requests_in_flight", "Requests currently being handled.", ("method",))
+request_queries = Histogram(
+    "http_request_db_queries", "SQL statements issued per request.", ("method", "route"), buckets=QUERY_COUNT_BUCKETS
+)
+request_query_time = Histogram("http_request_db_seconds", "Time spent in SQL per request.", ("method", "route"))
+db_queries = Counter("db_queries_total", "SQL statements executed.")
+db_query_time = Histogram("db_query_duration_seconds", "Time per SQL statement.")
+upstream_latency = Histogram(
+    "upstream_request_duration_seconds", "Geoapify request latency.", ("endpoint", "status")
+)
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+
+
+# Set per request by MetricsMiddleware. The stats object is shared, so queries run in
+# the threadpool (which copies the context) still count toward the request.
+current_queries: ContextVar[QueryStats | None] = ContextVar("current_queries", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    db_queries.inc()
+    db_query_time.observe(elapsed)
+    stats = current_queries.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+
+
+def instrument_engine(sync_engine):
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def route_label(scope) -> str:
+    # The matched template, not the raw path, keeps label cardinality bounded
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, in-flight requests and SQL use per route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        stats = QueryStats()
+        token = current_queries.set(stats)
+        http_in_flight.inc(method)
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = route_label(scope)
+            http_in_flight.dec(method)
+            http_requests.inc(method, route, str(status))
+            http_latency.observe(elapsed, method, route)
+            request_queries.observe(stats.count, method, route)
+            request_query_time.observe(stats.seconds, method, route)
+            current_queries.reset(token)
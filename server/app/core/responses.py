@@ -0,0 +1,24 @@
+import json
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional; stdlib json is used instead
+    orjson = None
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it's installed.
+
+    Routes with a response_model don't need this: FastAPI serializes those straight
+    to bytes through Pydantic. It's for payloads built by hand (dicts, streamed chunks).
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
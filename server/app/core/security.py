@@ -1,8 +1,24 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
+from fastapi import Depends, HTTPException, Request
 from jose import jwt, JWTError
 from passlib.context import CryptContext
-from app.database import SessionLocal
+from sqlalchemy import event
+from app.core.config import (
+    AUTH_CACHE_SIZE,
+    AUTH_CACHE_TTL,
+    BCRYPT_ROUNDS,
+    PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_MAX_PENDING,
+)
+from app.database import SessionLocal, AsyncSessionLocal, DbSession, session_dependency
+from app.models import User
+from app.utils.cache import TTLCache
 from sqlalchemy.orm import Session
 
 SECRET_KEY = "CHANGE_THIS_SECRET"
@@ -11,14 +27,17 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with any other cost are flagged by needs_update and rehashed on login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+_password_pool: ProcessPoolExecutor | None = None
+_password_pending = 0
+
+get_db = session_dependency(SessionLocal, AsyncSessionLocal)
+
+def get_session_opener(request: Request):
+    """Opens sessions for background work that outlives the request, honouring any get_db override."""
+    return asynccontextmanager(request.app.dependency_overrides.get(get_db, get_db))
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -27,6 +46,45 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """(valid, new_hash); new_hash is set when the stored hash uses an outdated cost."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def get_password_pool() -> ProcessPoolExecutor:
+    global _password_pool
+    if _password_pool is None:
+        _password_pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+    return _password_pool
+
+
+async def warm_password_pool():
+    """Start the bcrypt worker processes now instead of on the first login."""
+    loop = asyncio.get_running_loop()
+    pool = get_password_pool()
+    await asyncio.gather(*[loop.run_in_executor(pool, abs, 0) for _ in range(PASSWORD_HASH_WORKERS)])
+
+
+def shutdown_password_pool():
+    global _password_pool
+    if _password_pool is not None:
+        _password_pool.shutdown(cancel_futures=True)
+        _password_pool = None
+
+
+async def run_password_job(fn, *args):
+    """Run bcrypt work in the process pool, failing fast with 503 once the queue is full."""
+    global _password_pending
+    if _password_pending >= PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(status_code=503, detail="Server busy, try again shortly", headers={"Retry-After": "1"})
+
+    _password_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(get_password_pool(), fn, *args)
+    finally:
+        _password_pending -= 1
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -47,3 +105,51 @@ def verify_token(token: str) -> Optional[dict]:
         return payload
     except JWTError:
         return None
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    username: str
+
+# access token -> Principal, so authenticated requests skip the JWT decode and user lookup
+principal_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+
+def _load_user(db: Session, user_id: Optional[int], username: Optional[str]) -> Optional[User]:
+    if user_id is not None:
+        return db.get(User, user_id)
+    # Tokens issued before the uid claim existed
+    return db.query(User).filter(User.username == username).first()
+
+async def get_current_user(request: Request, db: DbSession = Depends(get_db)) -> Principal:
+    token = request.cookies.get("access_token")
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
+    payload = verify_token(token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Token expired")
+
+    user = await db.run_sync(_load_user, payload.get("uid"), payload.get("sub"))
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    principal = Principal(id=user.id, username=user.username)
+    # Never serve a principal past its token's own expiry
+    principal_cache.set(token, principal, ttl=min(AUTH_CACHE_TTL, payload["exp"] - time.time()))
+    return principal
+
+def invalidate_token(token: Optional[str]):
+    if token:
+        principal_cache.delete(token)
+
+def invalidate_user(user_id: int):
+    principal_cache.delete_where(lambda p: p.id == user_id)
+
+@event.listens_for(User, "after_delete")
+def _forget_deleted_user(mapper, connection, target):
+    invalidate_user(target.id)
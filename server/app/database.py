@@ -1,12 +1,167 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from starlette.concurrency import run_in_threadpool, iterate_in_threadpool
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import StaticPool
+from app.core.metrics import instrument_engine
+from app.core.config import (
+    DATABASE_URL,
+    ASYNC_DATABASE_URL,
+    DATABASE_ASYNC,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_STATEMENT_TIMEOUT,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_SYNCHRONOUS,
+    SQLITE_MMAP_SIZE,
+    SQLITE_CACHE_SIZE,
+)
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./database.db"
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+
+def async_url_for(url: str) -> str:
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS.get(parsed.get_backend_name(), parsed.drivername)).render_as_string(
+        hide_password=False
+    )
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={DB_STATEMENT_TIMEOUT}")
+    cursor.close()
+
+
+def engine_options(url: str) -> dict:
+    parsed = make_url(url)
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if parsed.get_backend_name() == "sqlite":
+        if parsed.database in (None, "", ":memory:"):
+            # Every connection to :memory: is a separate database; share one
+            options["poolclass"] = StaticPool
+        else:
+            options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+        if not parsed.drivername.startswith("sqlite+aiosqlite"):
+            options["connect_args"] = {"check_same_thread": False}
+    else:
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+        if parsed.drivername == "postgresql+asyncpg":
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT)}}
+        elif parsed.get_backend_name() == "postgresql":
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT}"}
+    return options
+
+
+def _merge_options(url: str, overrides: dict) -> dict:
+    options = {**engine_options(url), **overrides}
+    if "poolclass" in overrides:
+        # Sizing only applies to the default queue pool
+        options.pop("pool_size", None)
+        options.pop("max_overflow", None)
+    return options
+
+
+def create_db_engine(url: str, **kwargs):
+    """Sync engine with the configured pool, plus SQLite pragmas on each new connection."""
+    db_engine = create_engine(url, **_merge_options(url, kwargs))
+    instrument_engine(db_engine)
+    if db_engine.dialect.name == "sqlite":
+        event.listen(db_engine, "connect", set_sqlite_pragmas)
+    return db_engine
+
+
+def create_async_db_engine(url: str, **kwargs):
+    db_engine = create_async_engine(url, **_merge_options(url, kwargs))
+    instrument_engine(db_engine.sync_engine)
+    if db_engine.dialect.name == "sqlite":
+        event.listen(db_engine.sync_engine, "connect", set_sqlite_pragmas)
+    return db_engine
+
+
+def warm_pool(db_engine, connections: int = DB_POOL_SIZE):
+    """Open pooled connections up front so early requests skip connect and pragma setup."""
+    opened = [db_engine.connect() for _ in range(connections)]
+    for connection in opened:
+        connection.exec_driver_sql("SELECT 1")
+        connection.close()
+
+
+async def warm_async_pool(db_engine, connections: int = DB_POOL_SIZE):
+    opened = [await db_engine.connect() for _ in range(connections)]
+    for connection in opened:
+        await connection.exec_driver_sql("SELECT 1")
+        await connection.close()
+
+
+SQLALCHEMY_DATABASE_URL = DATABASE_URL
+
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = (
+    create_async_db_engine(ASYNC_DATABASE_URL or async_url_for(SQLALCHEMY_DATABASE_URL)) if DATABASE_ASYNC else None
+)
+AsyncSessionLocal = (
+    async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False) if async_engine else None
+)
+
 Base = declarative_base()
+
+
+class ThreadPoolSession:
+    """Wraps a sync Session in the subset of the AsyncSession API the routers use.
+
+    Routers hand their query code to `run_sync`, which runs it on the native event
+    loop driver in async mode and in Starlette's threadpool here, so the same handler
+    works against either engine.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def stream(self, statement):
+        result = await run_in_threadpool(self.sync_session.execute, statement)
+        return _ThreadPoolResult(result)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+
+class _ThreadPoolResult:
+    def __init__(self, result):
+        self._result = result
+
+    async def partitions(self, size: int | None = None):
+        async for rows in iterate_in_threadpool(self._result.partitions(size)):
+            yield rows
+
+
+DbSession = AsyncSession | ThreadPoolSession
+
+
+def session_dependency(sync_factory: sessionmaker, async_factory: async_sessionmaker | None = None):
+    """Build a `get_db` dependency yielding an AsyncSession when an async factory is given."""
+
+    async def get_db():
+        if async_factory is not None:
+            async with async_factory() as session:
+                yield session
+        else:
+            session = ThreadPoolSession(sync_factory())
+            try:
+                yield session
+            finally:
+                await session.close()
+
+    return get_db
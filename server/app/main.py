@@ -1,8 +1,39 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import auth, lists, locations, search
+from starlette.concurrency import run_in_threadpool
+from app.routers import auth, bootstrap, lists, locations, search, autocomplete, transfer, places
+from app.core.compression import CompressionMiddleware
+from app.core.metrics import MetricsMiddleware, CONTENT_TYPE, render_metrics
+from app.core.security import warm_password_pool, shutdown_password_pool
+from app.database import engine, async_engine, warm_pool, warm_async_pool
+from app.models import create_schema
+from app.utils.geoapify import get_client, close_client, search_cache
+from app.utils.place_details import details_refresher
+from app.utils.prefetch import search_prefetcher
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Each worker runs this; create_schema serializes them on a database lock
+    await run_in_threadpool(create_schema, engine)
+    if async_engine is not None:
+        await warm_async_pool(async_engine)
+    else:
+        await run_in_threadpool(warm_pool, engine)
+    get_client()
+    await run_in_threadpool(search_cache.warm)
+    await warm_password_pool()
+    yield
+    search_prefetcher.cancel()
+    details_refresher.cancel()
+    await close_client()
+    shutdown_password_pool()
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
 
 origins = ["http://localhost:5173", "http://127.0.0.1:5173"]
 
@@ -13,9 +44,21 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
+# Added last so it wraps CORS too and times the whole request
+app.add_middleware(MetricsMiddleware)
 
 # Register routers
 app.include_router(auth.router)
+app.include_router(bootstrap.router)
+# Before lists: its /{list_id} routes would otherwise match /lists/export and /lists/import
+app.include_router(transfer.router)
 app.include_router(lists.router)
 app.include_router(locations.router)
-app.include_router(search.router)
\ No newline at end of file
+app.include_router(search.router)
+app.include_router(autocomplete.router)
+app.include_router(places.router)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
@@ -1,6 +1,11 @@
-from sqlalchemy import Column, Integer, Float, String, ForeignKey, Boolean
+from sqlalchemy import (
+    Column, Integer, Float, String, ForeignKey, Boolean, DateTime, Index, JSON, MetaData, Table, event, func, inspect,
+    select,
+)
 from sqlalchemy.orm import relationship
-from app.database import Base, engine
+from sqlalchemy.schema import CreateTable
+from app.core.config import DB_SCHEMA_LOCK_TIMEOUT, DB_STATEMENT_TIMEOUT
+from app.database import Base
 
 class User(Base):
     __tablename__ = "users"
@@ -8,17 +13,24 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True)
     hashed_password = Column(String, nullable=False)
+    # Bumped whenever the user's set of lists changes; drives the GET /lists ETag
+    lists_version = Column(Integer, nullable=False, default=1, server_default="1")
 
     lists = relationship("List", back_populates="user", cascade="all, delete-orphan")
 
 
 class List(Base):
     __tablename__ = "lists"
+    # Never reuse a deleted list's id: a new list starts again at version 1, and its
+    # ETags and cache keys are built from (id, version)
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     name = Column(String, nullable=False)
     is_default = Column(Boolean, nullable=False, default=False)
+    # Bumped whenever the list's locations change; drives the GET /lists/{id} ETag
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     user = relationship("User", back_populates="lists")
     locations = relationship("ListLocation", back_populates="list", cascade="all, delete-orphan")
@@ -40,6 +52,12 @@ class Location(Base):
 
 class ListLocation(Base):
     __tablename__ = "list_locations"
+    __table_args__ = (
+        # One row per membership; also serves every lookup by list_id
+        Index("uq_list_locations_list_id_location_id", "list_id", "location_id", unique=True),
+        # "Which lists hold this place" without touching the table
+        Index("ix_list_locations_location_id_list_id", "location_id", "list_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     list_id = Column(Integer, ForeignKey("lists.id"), nullable=False)
@@ -49,5 +67,203 @@ class ListLocation(Base):
     location = relationship("Location", back_populates="lists")
 
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+class PlaceDetails(Base):
+    """Geoapify place details, cached per place_id; see app.utils.place_details."""
+    __tablename__ = "place_details"
+
+    place_id = Column(String, primary_key=True)
+    # Parsed fields (see geoapify.parse_details); {} when Geoapify has none for the place
+    data = Column(JSON, nullable=False)
+    # Unix time, compared against PLACE_DETAILS_TTL
+    fetched_at = Column(Float, nullable=False)
+
+
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String, nullable=False)
+    applied_at = Column(DateTime, nullable=False, server_default=func.now())
+
+
+# SQLite R*Tree over location coordinates. It lives outside Base.metadata so create_all
+# doesn't try to build it as a plain table; the hooks below manage it instead.
+LocationRTree = Table(
+    "locations_rtree",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("min_lat", Float),
+    Column("max_lat", Float),
+    Column("min_lon", Float),
+    Column("max_lon", Float),
+)
+
+SPATIAL_INDEX_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS locations_rtree_insert AFTER INSERT ON locations BEGIN
+        INSERT INTO locations_rtree VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS locations_rtree_update AFTER UPDATE OF latitude, longitude ON locations BEGIN
+        UPDATE locations_rtree SET min_lat = new.latitude, max_lat = new.latitude,
+            min_lon = new.longitude, max_lon = new.longitude WHERE id = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS locations_rtree_delete AFTER DELETE ON locations BEGIN
+        DELETE FROM locations_rtree WHERE id = old.id;
+    END""",
+]
+
+# SQLite FTS5 index over saved places, one row per list membership (rowid = list_locations.id)
+# so a search can be limited to one user's places through the owner column instead of
+# matching every location in the database first. Kept in sync by the triggers below.
+SavedPlacesFTS = Table(
+    "saved_places_fts",
+    MetaData(),
+    Column("rowid", Integer, primary_key=True),
+    Column("owner", String),
+    Column("name", String),
+    Column("address", String),
+    Column("category", String),
+    # FTS5's hidden ranking column
+    Column("rank", Float),
+)
+
+SEARCH_INDEX_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS saved_places_fts_insert AFTER INSERT ON list_locations BEGIN
+        INSERT INTO saved_places_fts (rowid, owner, name, address, category)
+        SELECT new.id, lists.user_id, locations.name, locations.address, locations.category
+        FROM lists, locations WHERE lists.id = new.list_id AND locations.id = new.location_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS saved_places_fts_delete AFTER DELETE ON list_locations BEGIN
+        DELETE FROM saved_places_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS saved_places_fts_update AFTER UPDATE OF name, address, category ON locations BEGIN
+        UPDATE saved_places_fts SET name = new.name, address = new.address, category = new.category
+        WHERE rowid IN (SELECT id FROM list_locations WHERE location_id = new.id);
+    END""",
+]
+
+# Migrations bring databases created by older releases up to the current schema;
+# create_all only creates missing tables. Each one runs once per database, in order,
+# and is written to be a no-op where create_all already built the current layout.
+
+def add_version_columns(connection):
+    inspector = inspect(connection)
+    added = {
+        "users": {"lists_version": "INTEGER NOT NULL DEFAULT 1"},
+        "lists": {"version": "INTEGER NOT NULL DEFAULT 1"},
+    }
+    for table, columns in added.items():
+        existing = {c["name"] for c in inspector.get_columns(table)}
+        for name, ddl in columns.items():
+            if name not in existing:
+                connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+
+def create_spatial_index(connection):
+    if connection.dialect.name != "sqlite":
+        return
+
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'locations_rtree'"
+    ).first()
+    if not exists:
+        connection.exec_driver_sql(
+            "CREATE VIRTUAL TABLE locations_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO locations_rtree SELECT id, latitude, latitude, longitude, longitude FROM locations"
+        )
+    for trigger in SPATIAL_INDEX_TRIGGERS:
+        connection.exec_driver_sql(trigger)
+
+def add_membership_indexes(connection):
+    # Keep the first of any duplicate memberships so the unique index can be built
+    connection.execute(ListLocation.__table__.delete().where(
+        ListLocation.id.not_in(
+            select(func.min(ListLocation.id)).group_by(ListLocation.list_id, ListLocation.location_id)
+        )
+    ))
+    for index in [*ListLocation.__table__.indexes, *List.__table__.indexes]:
+        index.create(connection, checkfirst=True)
+
+def create_search_index(connection):
+    if connection.dialect.name != "sqlite":
+        return
+
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'saved_places_fts'"
+    ).first()
+    if not exists:
+        # unicode61 folds case and diacritics; the 2 and 3 character prefix indexes keep
+        # type-ahead queries on short prefixes from scanning every term
+        connection.exec_driver_sql(
+            "CREATE VIRTUAL TABLE saved_places_fts USING fts5(owner, name, address, category, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO saved_places_fts (rowid, owner, name, address, category) "
+            "SELECT list_locations.id, lists.user_id, locations.name, locations.address, locations.category "
+            "FROM list_locations JOIN lists ON lists.id = list_locations.list_id "
+            "JOIN locations ON locations.id = list_locations.location_id"
+        )
+    for trigger in SEARCH_INDEX_TRIGGERS:
+        connection.exec_driver_sql(trigger)
+
+def autoincrement_list_ids(connection):
+    if connection.dialect.name != "sqlite":
+        return
+
+    ddl = connection.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'lists'").scalar()
+    if "AUTOINCREMENT" in ddl.upper():
+        return
+    # SQLite can't add AUTOINCREMENT to a table, so rebuild it under the current definition
+    metadata = MetaData()
+    User.__table__.to_metadata(metadata)
+    rebuilt = List.__table__.to_metadata(metadata, name="lists_rebuilt")
+    connection.execute(CreateTable(rebuilt))
+    columns = ", ".join(c.name for c in List.__table__.columns)
+    connection.exec_driver_sql(f"INSERT INTO lists_rebuilt ({columns}) SELECT {columns} FROM lists")
+    connection.exec_driver_sql("DROP TABLE lists")
+    # Legacy mode renames without re-checking the triggers and foreign keys that name
+    # "lists", which would otherwise fail while the table is missing
+    connection.exec_driver_sql("PRAGMA legacy_alter_table = ON")
+    connection.exec_driver_sql("ALTER TABLE lists_rebuilt RENAME TO lists")
+    connection.exec_driver_sql("PRAGMA legacy_alter_table = OFF")
+    for index in List.__table__.indexes:
+        index.create(connection)
+
+MIGRATIONS = [
+    add_version_columns, create_spatial_index, add_membership_indexes, create_search_index, autoincrement_list_ids,
+]
+
+def run_migrations(target, connection, **kw):
+    applied = set(connection.scalars(select(SchemaMigration.version)))
+    for version, migration in enumerate(MIGRATIONS, start=1):
+        if version not in applied:
+            migration(connection)
+            connection.execute(SchemaMigration.__table__.insert().values(version=version, name=migration.__name__))
+
+def drop_virtual_tables(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("DROP TABLE IF EXISTS locations_rtree")
+        connection.exec_driver_sql("DROP TABLE IF EXISTS saved_places_fts")
+
+event.listen(Base.metadata, "after_create", run_migrations)
+event.listen(Base.metadata, "before_drop", drop_virtual_tables)
+
+def create_schema(bind):
+    """Create missing tables and apply pending migrations.
+
+    Holds a database-wide write lock throughout, so when several workers start at once
+    one of them migrates and the rest wait, then find nothing left to do.
+    """
+    with bind.connect() as connection:
+        if connection.dialect.name == "sqlite":
+            connection.exec_driver_sql(f"PRAGMA busy_timeout={DB_SCHEMA_LOCK_TIMEOUT}")
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+        elif connection.dialect.name == "postgresql":
+            connection.exec_driver_sql("SELECT pg_advisory_xact_lock(hashtext('schema_migrations'))")
+        try:
+            Base.metadata.create_all(connection)
+            connection.commit()
+        finally:
+            if connection.dialect.name == "sqlite":
+                connection.exec_driver_sql(f"PRAGMA busy_timeout={DB_STATEMENT_TIMEOUT}")
@@ -1,15 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, Response, Request
 from sqlalchemy.orm import Session
+from app.database import DbSession
 from app.models import User, List
 from app.core.security import (
-    verify_password,
+    verify_and_update_password,
+    run_password_job,
     create_access_token,
     create_refresh_token,
     verify_token,
     hash_password,
-    get_db
+    get_db,
+    get_current_user,
+    invalidate_token,
+    Principal,
 )
-from app.schemas.user import RegisterCreds, LoginCreds
+from app.schemas.common import Message
+from app.schemas.user import RegisterCreds, LoginCreds, UserOut, AuthResponse
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
@@ -37,16 +43,11 @@ def clear_auth_cookies(response: Response):
     response.delete_cookie("access_token")
     response.delete_cookie("refresh_token")
 
-@router.post("/register")
-def register(data: RegisterCreds, db: Session = Depends(get_db)):
-    # Check if username already exists
-    existing_user = db.query(User).filter(User.username == data.username).first()
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Username already taken")
+def _username_taken(db: Session, username: str) -> bool:
+    return db.query(User).filter(User.username == username).first() is not None
 
-    # Create user
-    hashed_pw = hash_password(data.password)
-    new_user = User(username=data.username, hashed_password=hashed_pw)
+def _create_user(db: Session, username: str, hashed_password: str) -> dict:
+    new_user = User(username=username, hashed_password=hashed_password)
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
@@ -56,46 +57,59 @@ def register(data: RegisterCreds, db: Session = Depends(get_db)):
         List(name="Favorites", user_id=new_user.id, is_default=True),
         List(name="Planned", user_id=new_user.id, is_default=True),
     ]
+    user = {"id": new_user.id, "username": new_user.username}
     db.add_all(default_lists)
     db.commit()
+    return user
+
+def _get_user_by_username(db: Session, username: str) -> User | None:
+    return db.query(User).filter(User.username == username).first()
+
+def _update_password_hash(db: Session, user_id: int, hashed_password: str):
+    db.get(User, user_id).hashed_password = hashed_password
+    db.commit()
+
+@router.post("/register", response_model=AuthResponse)
+async def register(data: RegisterCreds, db: DbSession = Depends(get_db)):
+    # Check if username already exists
+    if await db.run_sync(_username_taken, data.username):
+        raise HTTPException(status_code=400, detail="Username already taken")
+
+    # Create user
+    hashed_pw = await run_password_job(hash_password, data.password)
+    new_user = await db.run_sync(_create_user, data.username, hashed_pw)
 
     return {
         "message": "User registered",
-        "user": {"id": new_user.id, "username": new_user.username},
+        "user": new_user,
     }
 
-@router.post("/login")
-def login(data: LoginCreds, response: Response, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == data.username).first()
-    if not user or not verify_password(data.password, user.hashed_password):
+@router.post("/login", response_model=AuthResponse)
+async def login(data: LoginCreds, response: Response, db: DbSession = Depends(get_db)):
+    user = await db.run_sync(_get_user_by_username, data.username)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    valid, new_hash = await run_password_job(verify_and_update_password, data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        await db.run_sync(_update_password_hash, user.id, new_hash)
 
-    access_token = create_access_token({"sub": str(user.username)})
-    refresh_token = create_refresh_token({"sub": str(user.username)})
+    claims = {"sub": str(user.username), "uid": user.id}
+    access_token = create_access_token(claims)
+    refresh_token = create_refresh_token(claims)
 
     set_auth_cookies(response, access_token, refresh_token)
 
     return {"message": "Logged in", "user": {"id": user.id, "username": user.username}}
 
-@router.get("/me")
-def me(request: Request, db: Session = Depends(get_db)):
-    token = request.cookies.get("access_token")
-    if not token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
-    payload = verify_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Token expired")
-
-    username = payload.get("sub")
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
+@router.get("/me", response_model=UserOut)
+async def me(user: Principal = Depends(get_current_user)):
     return {"id": user.id, "username": user.username}
 
-@router.post("/refresh")
-def refresh(request: Request, response: Response, db: Session = Depends(get_db)):
+@router.post("/refresh", response_model=Message)
+async def refresh(request: Request, response: Response, db: DbSession = Depends(get_db)):
     refresh = request.cookies.get("refresh_token")
     if not refresh:
         raise HTTPException(status_code=401, detail="Missing refresh token")
@@ -105,18 +119,21 @@ def refresh(request: Request, response: Response, db: Session = Depends(get_db))
         raise HTTPException(status_code=401, detail="Refresh expired")
 
     username = payload.get("sub")
-    user = db.query(User).filter(User.username == username).first()
+    user = await db.run_sync(_get_user_by_username, username)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    new_access = create_access_token({"sub": username})
-    new_refresh = create_refresh_token({"sub": username})
+    claims = {"sub": username, "uid": user.id}
+    new_access = create_access_token(claims)
+    new_refresh = create_refresh_token(claims)
 
+    invalidate_token(request.cookies.get("access_token"))
     set_auth_cookies(response, new_access, new_refresh)
 
     return {"message": "Token refreshed"}
 
-@router.post("/logout")
-def logout(response: Response):
+@router.post("/logout", response_model=Message)
+async def logout(request: Request, response: Response):
+    invalidate_token(request.cookies.get("access_token"))
     clear_auth_cookies(response)
     return {"message": "Logged out"}
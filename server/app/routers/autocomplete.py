@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from app.core.responses import FastJSONResponse
+from app.schemas.location import AutocompleteParams, SearchResponse
+from app.utils.cache import LatestOnly, Superseded
+from app.utils.geoapify import autocomplete_query, autocomplete_cache
+
+router = APIRouter(prefix="/autocomplete", tags=["Search"])
+
+# One lookup per client at a time: each keystroke cancels the previous one's upstream call
+latest_lookup = LatestOnly()
+
+def client_key(request: Request) -> str | None:
+    """Identifies the typing client; anonymous callers without X-Client-Id are never cancelled."""
+    return request.headers.get("X-Client-Id") or request.cookies.get("access_token")
+
+@router.get("", response_model=SearchResponse)
+async def autocomplete(request: Request, params: AutocompleteParams = Depends()):
+    key = client_key(request)
+    if key is None:
+        results = await autocomplete_query(params.text, params.lat, params.long)
+    else:
+        try:
+            results = await latest_lookup.run(key, autocomplete_query, params.text, params.lat, params.long)
+        except Superseded:
+            raise HTTPException(status_code=409, detail="Superseded by a newer request")
+    return FastJSONResponse({"results": results})
+
+@router.get("/cache-stats")
+def cache_stats():
+    return autocomplete_cache.stats()
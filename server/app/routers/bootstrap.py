@@ -0,0 +1,66 @@
+from collections import Counter
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.database import DbSession
+from app.models import List, Location, ListLocation
+from app.schemas.list import Bootstrap
+from app.core.compression import Payload, payload_response
+from app.core.responses import dumps
+from app.core.security import get_db, get_current_user, Principal
+from app.routers.lists import location_to_dict, user_lists_version
+from app.utils.etag import make_etag, etag_matches, etag_headers, not_modified
+
+router = APIRouter(tags=["Bootstrap"])
+
+def memberships_stmt(user_id: int, *columns):
+    """`columns` for every (list, place) membership of the user's lists, in list then insertion order."""
+    return (
+        select(ListLocation.list_id, *columns)
+        .join(Location, Location.id == ListLocation.location_id)
+        .join(List, List.id == ListLocation.list_id)
+        .where(List.user_id == user_id)
+        .order_by(ListLocation.list_id, ListLocation.id)
+    )
+
+def _bootstrap_lists(db: Session, user_id: int, with_locations: bool) -> dict:
+    # Two queries whatever the number of lists: the lists, then every membership at once
+    lists = db.execute(
+        select(List.id, List.name, List.is_default).where(List.user_id == user_id).order_by(List.id)
+    ).all()
+
+    if with_locations:
+        locations = {lst.id: [] for lst in lists}
+        for list_id, loc in db.execute(memberships_stmt(user_id, Location)):
+            locations[list_id].append(location_to_dict(loc))
+        return {
+            "lists": [
+                {"id": l.id, "name": l.name, "is_default": l.is_default,
+                 "count": len(locations[l.id]), "locations": locations[l.id]}
+                for l in lists
+            ],
+            "place_ids": None,
+        }
+
+    rows = db.execute(memberships_stmt(user_id, Location.place_id)).all()
+    counts = Counter(list_id for list_id, _ in rows)
+    return {
+        "lists": [{"id": l.id, "name": l.name, "is_default": l.is_default, "count": counts[l.id]} for l in lists],
+        "place_ids": sorted({place_id for _, place_id in rows}),
+    }
+
+@router.get("/bootstrap", response_model=Bootstrap)
+async def bootstrap(
+    request: Request,
+    locations: bool = Query(False, description="Include every list's locations instead of counts and place_ids"),
+    user: Principal = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
+    # Read the version before the rows so a concurrent change can only make the ETag stale, never the body
+    etag = make_etag("bootstrap", user.id, *await db.run_sync(user_lists_version, user.id), int(locations))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    body = await db.run_sync(_bootstrap_lists, user.id, locations)
+    payload = Payload(dumps({"user": {"id": user.id, "username": user.username}, **body}))
+    return await payload_response(request, payload, headers=etag_headers(etag))
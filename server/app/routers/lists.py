@@ -1,69 +1,381 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+import re
+from sqlalchemy import String, cast, func, literal_column, or_, select, update
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import Session
-from app.models import List, User
-from app.schemas.list import ListCreate
-from app.core.security import get_db, verify_token
-from fastapi import Request
+from app.database import DbSession
+from app.models import List, Location, ListLocation, LocationRTree, SavedPlacesFTS, User
+from app.schemas.common import Message
+from app.schemas.list import ListCreate, ListSummary, ListCreated, ListDetail
+from app.schemas.location import LocationCreate, SavedLocationOut
+from app.core.compression import Payload, payload_response
+from app.core.config import LIST_PAYLOAD_CACHE_SIZE, LIST_PAYLOAD_CACHE_TTL
+from app.core.responses import dumps
+from app.core.security import get_db, get_current_user, get_session_opener, Principal
+from app.utils.cache import TTLCache
+from app.utils.etag import make_etag, etag_matches, etag_headers, not_modified
+from app.utils.geo import bbox_around, nearest_first
+from app.utils.place_details import get_place_details
 
 router = APIRouter(prefix="/lists", tags=["Lists"])
 
-def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
-    token = request.cookies.get("access_token")
-    if not token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
+STREAM_BATCH_SIZE = 500
+# Words of a search, as the FTS5 unicode61 tokenizer splits them
+SEARCH_TERM = re.compile(r"\w+")
+# bm25 weights per FTS column: owner, name, address, category
+SEARCH_RANKING = "bm25(0.0, 10.0, 4.0, 2.0)"
 
-    payload = verify_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Token expired")
+# (user id, ETag) -> (list id, Payload); the ETag embeds the list version, so edits never hit stale entries
+list_payloads = TTLCache(maxsize=LIST_PAYLOAD_CACHE_SIZE, ttl=LIST_PAYLOAD_CACHE_TTL)
 
-    username = payload.get("sub")
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+def bump_list_version(db: Session, list_id: int):
+    db.execute(update(List).where(List.id == list_id).values(version=List.version + 1))
 
-@router.get("")
-def get_lists(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    lists = db.query(List).filter(List.user_id == user.id).all()
-    return [{"id": l.id, "name": l.name, "is_default": l.is_default} for l in lists]
+def bump_lists_version(db: Session, user_id: int):
+    db.execute(update(User).where(User.id == user_id).values(lists_version=User.lists_version + 1))
+
+def _lists_version(db: Session, user_id: int) -> int:
+    return db.query(User.lists_version).filter(User.id == user_id).scalar()
+
+def user_lists_version(db: Session, user_id: int) -> tuple[int, int]:
+    """(lists_version, sum of list versions): changes whenever any of the user's lists or their places do."""
+    # List versions only grow and deletions bump lists_version, so this changes on every edit
+    return tuple(
+        db.query(User.lists_version, func.coalesce(func.sum(List.version), 0))
+        .outerjoin(List, List.user_id == User.id)
+        .filter(User.id == user_id)
+        .group_by(User.id)
+        .one()
+    )
 
+def _get_lists(db: Session, user_id: int) -> list[dict]:
+    lists = db.query(List).filter(List.user_id == user_id).all()
+    return [{"id": l.id, "name": l.name, "is_default": l.is_default} for l in lists]
 
-@router.post("")
-def create_list(list_data: ListCreate, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    new_list = List(name=list_data.name, user_id=user.id)
+def _create_list(db: Session, user_id: int, name: str) -> dict:
+    new_list = List(name=name, user_id=user_id)
     db.add(new_list)
+    bump_lists_version(db, user_id)
     db.commit()
     db.refresh(new_list)
-    return {"id": new_list.id, "name": new_list.name, "message": "List created successfully"}
-
+    return {"id": new_list.id, "name": new_list.name}
 
-@router.get("/{list_id}")
-def get_list(list_id: int, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    lst = db.query(List).filter(List.id == list_id, List.user_id == user.id).first()
+def get_owned_list(db: Session, list_id: int, user_id: int) -> List:
+    lst = db.query(List).filter(List.id == list_id, List.user_id == user_id).first()
     if not lst:
         raise HTTPException(status_code=404, detail="List not found")
+    return lst
 
-    locations = [{
-        "id": ll.location.id,
-        "name": ll.location.name,
-        "address": ll.location.address,
-        "latitude": ll.location.latitude,
-        "longitude": ll.location.longitude,
-        "place_id": ll.location.place_id,
-        "category": ll.location.category,
-    } for ll in lst.locations]
+def insert_ignoring_conflicts(db: Session, table, index_elements: list[str], rows: list[dict]):
+    """INSERT ... ON CONFLICT DO NOTHING for the session's dialect."""
+    insert = sqlite.insert
+    if db.get_bind().dialect.name == "postgresql":
+        # Imported here: the postgresql dialect adds ~100 ms to startup
+        from sqlalchemy.dialects import postgresql
+        insert = postgresql.insert
+    db.execute(insert(table).values(rows).on_conflict_do_nothing(index_elements=index_elements))
 
-    return {"id": lst.id, "name": lst.name, "locations": locations, "is_default": lst.is_default}
+def add_locations_to_list(db: Session, user_id: int, list_id: int, items: list[LocationCreate]) -> list[dict]:
+    """Save each location and add it to the list in one commit; returns a status per item."""
+    lst = get_owned_list(db, list_id, user_id)
 
+    unique = {}
+    for item in items:
+        unique.setdefault(item.place_id, item)
 
-@router.delete("/{list_id}")
-def delete_list(list_id: int, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    lst = db.query(List).filter(List.id == list_id, List.user_id == user.id).first()
-    if not lst:
-        raise HTTPException(status_code=404, detail="List not found")
+    insert_ignoring_conflicts(db, Location.__table__, ["place_id"], [i.model_dump() for i in unique.values()])
+    ids = dict(db.execute(select(Location.place_id, Location.id).where(Location.place_id.in_(list(unique)))).all())
+
+    linked = set(db.scalars(
+        select(ListLocation.location_id).where(
+            ListLocation.list_id == lst.id, ListLocation.location_id.in_(list(ids.values()))
+        )
+    ))
+    new_links = [{"list_id": lst.id, "location_id": ids[p]} for p in unique if ids[p] not in linked]
+    if new_links:
+        # A concurrent request may have linked some of these since the check above
+        insert_ignoring_conflicts(db, ListLocation.__table__, ["list_id", "location_id"], new_links)
+        bump_list_version(db, lst.id)
+    db.commit()
+
+    results = []
+    seen = set()
+    for item in items:
+        if item.place_id in seen:
+            status = "duplicate"
+        elif ids[item.place_id] in linked:
+            status = "already_in_list"
+        else:
+            status = "added"
+        seen.add(item.place_id)
+        results.append({"place_id": item.place_id, "status": status})
+    return results
+
+@router.get("", response_model=list[ListSummary])
+async def get_lists(
+    request: Request,
+    response: Response,
+    user: Principal = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
+    # Read the version before the rows so a concurrent change can only make the ETag stale, never the body
+    etag = make_etag("lists", user.id, await db.run_sync(_lists_version, user.id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    response.headers.update(etag_headers(etag))
+    return await db.run_sync(_get_lists, user.id)
+
+
+@router.post("", response_model=ListCreated)
+async def create_list(list_data: ListCreate, user: Principal = Depends(get_current_user), db: DbSession = Depends(get_db)):
+    new_list = await db.run_sync(_create_list, user.id, list_data.name)
+    return {**new_list, "message": "List created successfully"}
+
+
+def location_to_dict(loc: Location) -> dict:
+    return {
+        "id": loc.id,
+        "name": loc.name,
+        "address": loc.address,
+        "latitude": loc.latitude,
+        "longitude": loc.longitude,
+        "place_id": loc.place_id,
+        "category": loc.category,
+    }
+
+def list_ids_agg(db: Session, column):
+    """Aggregate of `column` as a comma-joined string, the form saved_location_to_dict reads."""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.group_concat(column)
+    return func.string_agg(cast(column, String), ",")
+
+def saved_location_to_dict(loc: Location, list_ids: str) -> dict:
+    return {**location_to_dict(loc), "list_ids": sorted(int(i) for i in list_ids.split(","))}
+
+def list_locations_stmt(list_id: int, cursor: int | None = None):
+    """(ListLocation.id, Location) rows for a list in insertion order, fetched with one join."""
+    stmt = (
+        select(ListLocation.id, Location)
+        .join(Location, Location.id == ListLocation.location_id)
+        .where(ListLocation.list_id == list_id)
+    )
+    if cursor is not None:
+        stmt = stmt.where(ListLocation.id > cursor)
+    return stmt.order_by(ListLocation.id)
+
+def filter_bbox(db: Session, query, south: float, west: float, north: float, east: float):
+    """Restrict a query joined to Location to the box, through the R*Tree on SQLite."""
+    if db.get_bind().dialect.name == "sqlite":
+        # R*Tree boxes are stored as float32 rounded outward, so match on overlap
+        # here and let the exact column filter below trim the edges
+        query = query.join(LocationRTree, LocationRTree.c.id == Location.id).filter(
+            LocationRTree.c.max_lat >= south,
+            LocationRTree.c.min_lat <= north,
+            LocationRTree.c.max_lon >= west,
+            LocationRTree.c.min_lon <= east,
+        )
+    return query.filter(
+        Location.latitude.between(south, north),
+        Location.longitude.between(west, east),
+    )
+
+def _get_list_page(db: Session, list_id: int, cursor: int | None, limit: int | None):
+    stmt = list_locations_stmt(list_id, cursor)
+    if limit is None:
+        return db.execute(stmt).all(), None
+
+    rows = db.execute(stmt.limit(limit + 1)).all()
+    next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def _get_list_by_distance(db: Session, list_id: int, lat: float, lon: float, radius: float | None, limit: int | None):
+    """Locations with their distance from (lat, lon), nearest first."""
+    stmt = list_locations_stmt(list_id)
+    if radius is not None:
+        stmt = filter_bbox(db, stmt, *bbox_around(lat, lon, radius))
+    rows = db.execute(stmt).all()
+
+    order, distances = nearest_first(
+        lat, lon,
+        [loc.latitude for _, loc in rows], [loc.longitude for _, loc in rows],
+        radius_m=radius, limit=limit,
+    )
+    return [{**location_to_dict(rows[i][1]), "distance": float(d)} for i, d in zip(order, distances)]
+
+async def stream_list(db: DbSession, lst: List, stmt):
+    head = dumps({"id": lst.id, "name": lst.name, "is_default": lst.is_default})
+    yield head[:-1] + b',"locations":['
+    sep = b""
+    result = await db.stream(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+    async for rows in result.partitions():
+        # Serialize the partition as one array and strip its brackets
+        yield sep + dumps([location_to_dict(loc) for _, loc in rows])[1:-1]
+        sep = b","
+    yield b"]}"
+
+def fts_query(user_id: int, text: str) -> str | None:
+    """FTS5 query for the user's places containing every word of `text`.
+
+    The last word matches as a prefix while it's still being typed (no trailing space).
+    Exact words can be seeked in the index, where a prefix has to be merged in full.
+    """
+    terms = SEARCH_TERM.findall(text.lower())
+    if not terms:
+        return None
+    # Quoting each word keeps FTS5 syntax (AND, NEAR, ^, ...) in user input literal
+    phrases = [f'"{term}"' for term in terms]
+    if SEARCH_TERM.match(text[-1]):
+        phrases[-1] += "*"
+    # Scoped to the place columns, or a number would also match the owner id
+    return f'owner:"{user_id}" AND {{name address category}}: (' + " ".join(phrases) + ")"
+
+def fts_search_stmt(query: str):
+    """(Location, "list_id,list_id") rows matching an fts_query, best ranked first."""
+    fts = SavedPlacesFTS.c
+    return (
+        select(Location, func.group_concat(ListLocation.list_id))
+        .select_from(SavedPlacesFTS)
+        .join(ListLocation, ListLocation.id == fts.rowid)
+        .join(Location, Location.id == ListLocation.location_id)
+        .where(
+            literal_column("saved_places_fts").op("MATCH")(query),
+            fts.rank.op("MATCH")(SEARCH_RANKING),
+        )
+        .group_by(Location.id)
+        # Lower ranks are better
+        .order_by(func.min(fts.rank))
+    )
+
+def ilike_search_stmt(db: Session, user_id: int, text: str):
+    """(Location, "list_id,list_id") rows containing every word of `text`, for databases without FTS5.
+
+    None when `text` has no words, as for fts_query.
+    """
+    terms = SEARCH_TERM.findall(text)
+    if not terms:
+        return None
+    return (
+        select(Location, list_ids_agg(db, List.id))
+        .join(ListLocation, ListLocation.location_id == Location.id)
+        .join(List, List.id == ListLocation.list_id)
+        .where(List.user_id == user_id)
+        .where(*[
+            # Escaped, since "_" is both a word character and a LIKE wildcard
+            or_(*(column.icontains(term, autoescape=True) for column in (Location.name, Location.address, Location.category)))
+            for term in terms
+        ])
+        .group_by(Location.id)
+        .order_by(Location.name)
+    )
+
+def _search_saved(db: Session, user_id: int, text: str, limit: int):
+    """(Location, "list_id,list_id") for the user's saved places matching `text`, best first."""
+    if db.get_bind().dialect.name == "sqlite":
+        query = fts_query(user_id, text)
+        stmt = None if query is None else fts_search_stmt(query)
+    else:
+        stmt = ilike_search_stmt(db, user_id, text)
+    if stmt is None:
+        return []
+    return db.execute(stmt.limit(limit)).all()
+
+# Declared before /{list_id}, which would otherwise take "search" as a list id
+@router.get("/search", response_model=list[SavedLocationOut])
+async def search_saved(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to match; the last can be partial"),
+    limit: int = Query(20, ge=1, le=100),
+    user: Principal = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
+    rows = await db.run_sync(_search_saved, user.id, q, limit)
+    return [saved_location_to_dict(loc, list_ids) for loc, list_ids in rows]
+
+async def _get_list_body(db: DbSession, lst: List, cursor, limit, lat, long, radius) -> dict:
+    if lat is not None:
+        locations = await db.run_sync(_get_list_by_distance, lst.id, lat, long, radius, limit)
+        next_cursor = None
+    else:
+        rows, next_cursor = await db.run_sync(_get_list_page, lst.id, cursor, limit)
+        locations = [location_to_dict(loc) for _, loc in rows]
+
+    # Already shaped like ListDetail; skip re-validating thousands of rows
+    return {
+        "id": lst.id,
+        "name": lst.name,
+        "locations": locations,
+        "is_default": lst.is_default,
+        "next_cursor": next_cursor,
+    }
+
+@router.get("/{list_id}", response_model=ListDetail)
+async def get_list(
+    request: Request,
+    list_id: int,
+    cursor: int | None = Query(None, description="Return locations after this cursor"),
+    limit: int | None = Query(None, ge=1, le=1000),
+    stream: bool = False,
+    lat: float | None = Query(None, ge=-90, le=90, description="Origin to sort locations by distance from"),
+    long: float | None = Query(None, ge=-180, le=180),
+    radius: float | None = Query(None, gt=0, description="Only locations within this many meters of the origin"),
+    details: bool = Query(False, description="Add Geoapify place details (opening hours, website, ...) to each location"),
+    user: Principal = Depends(get_current_user),
+    db: DbSession = Depends(get_db),
+    open_session=Depends(get_session_opener)
+):
+    by_distance = lat is not None or long is not None
+    if by_distance and (lat is None or long is None):
+        raise HTTPException(status_code=400, detail="lat and long must be given together")
+    if radius is not None and not by_distance:
+        raise HTTPException(status_code=400, detail="radius requires lat and long")
+    if by_distance and (cursor is not None or stream):
+        raise HTTPException(status_code=400, detail="Distance ordering can't be combined with cursor or stream")
+    if details and stream:
+        raise HTTPException(status_code=400, detail="details can't be combined with stream")
+
+    lst = await db.run_sync(get_owned_list, list_id, user.id)
+
+    if details:
+        # Details are refreshed independently of the list version, so this isn't ETagged or cached
+        body = await _get_list_body(db, lst, cursor, limit, lat, long, radius)
+        enriched = await get_place_details(db, open_session, [loc["place_id"] for loc in body["locations"]])
+        for loc in body["locations"]:
+            loc["details"] = enriched[loc["place_id"]]
+        return await payload_response(request, Payload(dumps(body)))
+
+    etag = make_etag("list", lst.id, lst.version, cursor, limit, int(stream), lat, long, radius)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    if stream:
+        return StreamingResponse(
+            stream_list(db, lst, list_locations_stmt(lst.id, cursor)),
+            media_type="application/json",
+            headers=etag_headers(etag),
+        )
+
+    cached = list_payloads.get((user.id, etag))
+    if cached is None:
+        cached = (lst.id, Payload(dumps(await _get_list_body(db, lst, cursor, limit, lat, long, radius))))
+        list_payloads.set((user.id, etag), cached)
+    return await payload_response(request, cached[1], headers=etag_headers(etag))
+
+
+def _delete_list(db: Session, list_id: int, user_id: int) -> str:
+    lst = get_owned_list(db, list_id, user_id)
     if lst.is_default:
         raise HTTPException(status_code=403, detail="Default lists cannot be deleted")
 
+    name = lst.name
     db.delete(lst)
+    bump_lists_version(db, user_id)
     db.commit()
-    return {"message": f"List '{lst.name}' deleted successfully"}
+    # Only frees memory: list ids are never reused, so these pages could not be served again anyway
+    list_payloads.delete_where(lambda entry: entry[0] == list_id)
+    return name
+
+@router.delete("/{list_id}", response_model=Message)
+async def delete_list(list_id: int, user: Principal = Depends(get_current_user), db: DbSession = Depends(get_db)):
+    name = await db.run_sync(_delete_list, list_id, user.id)
+    return {"message": f"List '{name}' deleted successfully"}
@@ -1,63 +1,113 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Body, Depends, HTTPException
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.models import List, Location, ListLocation, User
-from app.schemas.location import LocationCreate
-from app.core.security import get_db, verify_token
+from app.database import DbSession
+from app.core.config import CLUSTER_CACHE_SIZE, CLUSTER_CACHE_TTL
+from app.models import List, Location, ListLocation
+from app.schemas.common import Message
+from app.schemas.location import (
+    LocationCreate,
+    BulkLocationCreate,
+    BBoxParams,
+    ClusterParams,
+    Cluster,
+    NearbyParams,
+    PlaceIdsBody,
+    ListStatus,
+    BulkResult,
+    SavedLocationOut,
+    NearbyLocationOut,
+)
+from app.core.security import get_db, get_current_user, Principal
+from app.routers.lists import (
+    get_owned_list, bump_list_version, insert_ignoring_conflicts, add_locations_to_list, location_to_dict, list_ids_agg,
+    saved_location_to_dict, filter_bbox, user_lists_version,
+)
+from app.utils.cache import TTLCache
+from app.utils.clustering import tiles_for_bbox, tile_bounds, cluster_points
+from app.utils.geo import bbox_around, nearest_first
 
 router = APIRouter(prefix="/locations", tags=["Locations"])
 
-def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
-    token = request.cookies.get("access_token")
-    if not token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
+BULK_MAX_ITEMS = 1000
+MAX_CLUSTER_TILES = 64
 
-    payload = verify_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Token expired")
+# (scope, zoom, x, y) -> clusters in that tile; scope embeds list versions so edits miss the cache
+cluster_cache = TTLCache(maxsize=CLUSTER_CACHE_SIZE, ttl=CLUSTER_CACHE_TTL)
 
-    username = payload.get("sub")
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+def list_memberships(db: Session, user_id: int, place_ids: list[str]) -> dict[str, list[dict]]:
+    """For each place, every list the user owns and whether the place is in it, in one query."""
+    saved = (
+        db.query(ListLocation.list_id, Location.place_id)
+        .join(Location, Location.id == ListLocation.location_id)
+        .filter(Location.place_id.in_(place_ids))
+        .subquery()
+    )
+    rows = (
+        db.query(List.id, List.name, saved.c.place_id)
+        .outerjoin(saved, saved.c.list_id == List.id)
+        .filter(List.user_id == user_id)
+        .order_by(List.id)
+        .all()
+    )
 
-@router.post("/{list_id}")
-def add_location(
-    list_id: int,
-    location_data: LocationCreate,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user_lists = {}
+    added = set()
+    for list_id, name, place_id in rows:
+        user_lists[list_id] = name
+        if place_id is not None:
+            added.add((list_id, place_id))
+
+    return {
+        place_id: [
+            {"id": list_id, "name": name, "added": (list_id, place_id) in added}
+            for list_id, name in user_lists.items()
+        ]
+        for place_id in place_ids
+    }
+
+# Declared before "/{list_id}" so the literal path wins the match
+@router.post("/check-locations", response_model=dict[str, list[ListStatus]])
+async def check_locations(
+    data: PlaceIdsBody,
+    user: Principal = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
 ):
-    lst = db.query(List).filter(List.id == list_id, List.user_id == user.id).first()
-    if not lst:
-        raise HTTPException(status_code=404, detail="List not found")
+    return await db.run_sync(list_memberships, user.id, list(dict.fromkeys(data.place_ids)))
 
-    loc = db.query(Location).filter(Location.place_id == location_data.place_id).first()
-    if not loc:
-        loc = Location(**location_data.model_dump())
-        db.add(loc)
-        db.commit()
-        db.refresh(loc)
 
-    if db.query(ListLocation).filter(ListLocation.list_id == lst.id, ListLocation.location_id == loc.id).first():
-        raise HTTPException(status_code=400, detail="Location already in list")
+def _add_location(db: Session, user_id: int, list_id: int, location_data: LocationCreate) -> str:
+    lst = get_owned_list(db, list_id, user_id)
 
-    db.add(ListLocation(list_id=lst.id, location_id=loc.id))
-    db.commit()
+    list_name = lst.name
 
-    return {"message": f"Location added to list '{lst.name}'"}
+    insert_ignoring_conflicts(db, Location.__table__, ["place_id"], [location_data.model_dump()])
+    location_id = db.scalar(select(Location.id).where(Location.place_id == location_data.place_id))
 
+    db.add(ListLocation(list_id=lst.id, location_id=location_id))
+    bump_list_version(db, lst.id)
+    try:
+        db.commit()
+    except IntegrityError:
+        # The unique (list_id, location_id) index also settles concurrent adds
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Location already in list")
+    return list_name
 
-@router.delete("/{list_id}/{place_id}")
-def remove_location(
+@router.post("/{list_id}", response_model=Message)
+async def add_location(
     list_id: int,
-    place_id: str,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    location_data: LocationCreate,
+    user: Principal = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
 ):
-    lst = db.query(List).filter(List.id == list_id, List.user_id == user.id).first()
-    if not lst:
-        raise HTTPException(status_code=404, detail="List not found")
+    list_name = await db.run_sync(_add_location, user.id, list_id, location_data)
+    return {"message": f"Location added to list '{list_name}'"}
+
+
+def _remove_location(db: Session, user_id: int, list_id: int, place_id: str):
+    lst = get_owned_list(db, list_id, user_id)
 
     loc = db.query(Location).filter(Location.place_id == place_id).first()
     if not loc:
@@ -68,28 +118,178 @@ def remove_location(
         raise HTTPException(status_code=404, detail="Location not in list")
 
     db.delete(link)
+    bump_list_version(db, lst.id)
     db.commit()
 
+@router.delete("/{list_id}/{place_id}", response_model=Message)
+async def remove_location(
+    list_id: int,
+    place_id: str,
+    user: Principal = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
+    await db.run_sync(_remove_location, user.id, list_id, place_id)
     return {"message": "Location removed"}
 
 
-@router.get("/check-location/{place_id}")
-def check_location(
-    place_id: str,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+@router.post("/{list_id}/bulk", response_model=BulkResult)
+async def bulk_add_locations(
+    list_id: int,
+    locations: list[BulkLocationCreate] = Body(..., min_length=1, max_length=BULK_MAX_ITEMS),
+    user: Principal = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
 ):
-    user_lists = db.query(List).filter(List.user_id == user.id).all()
-    location = db.query(Location).filter(Location.place_id == place_id).first()
+    results = await db.run_sync(add_locations_to_list, user.id, list_id, locations)
+    added = sum(r["status"] == "added" for r in results)
+    return {"message": f"{added} location(s) added", "results": results}
 
-    results = []
-    for lst in user_lists:
-        added = False
-        if location:
-            added = db.query(ListLocation).filter(
-                ListLocation.list_id == lst.id, ListLocation.location_id == location.id
-            ).first() is not None
 
-        results.append({"id": lst.id, "name": lst.name, "added": added})
+def _bulk_remove_locations(db: Session, user_id: int, list_id: int, place_ids: list[str]) -> list[dict]:
+    lst = get_owned_list(db, list_id, user_id)
+
+    linked = dict(db.execute(
+        select(Location.place_id, ListLocation.id)
+        .join(ListLocation, ListLocation.location_id == Location.id)
+        .where(ListLocation.list_id == lst.id, Location.place_id.in_(place_ids))
+    ).all())
+    if linked:
+        db.execute(delete(ListLocation).where(ListLocation.id.in_(list(linked.values()))))
+        bump_list_version(db, lst.id)
+    db.commit()
 
+    results = []
+    for place_id in dict.fromkeys(place_ids):
+        results.append({"place_id": place_id, "status": "removed" if place_id in linked else "not_in_list"})
     return results
+
+@router.post("/{list_id}/bulk-remove", response_model=BulkResult)
+async def bulk_remove_locations(
+    list_id: int,
+    data: PlaceIdsBody,
+    user: Principal = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
+    results = await db.run_sync(_bulk_remove_locations, user.id, list_id, data.place_ids)
+    removed = sum(r["status"] == "removed" for r in results)
+    return {"message": f"{removed} location(s) removed", "results": results}
+
+
+@router.get("/check-location/{place_id}", response_model=list[ListStatus])
+async def check_location(
+    place_id: str,
+    user: Principal = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
+    return (await db.run_sync(list_memberships, user.id, [place_id]))[place_id]
+
+def saved_locations_in_bbox(db: Session, user_id: int, south: float, west: float, north: float, east: float):
+    """(Location, "list_id,list_id") rows for the user's saved places inside the box."""
+    query = (
+        db.query(Location, list_ids_agg(db, List.id))
+        .join(ListLocation, ListLocation.location_id == Location.id)
+        .join(List, List.id == ListLocation.list_id)
+        .filter(List.user_id == user_id)
+    )
+    return filter_bbox(db, query, south, west, north, east).group_by(Location.id).all()
+
+@router.get("/within", response_model=list[SavedLocationOut])
+async def locations_within(
+    bbox: BBoxParams = Depends(),
+    user: Principal = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
+    if bbox.south > bbox.north or bbox.west > bbox.east:
+        raise HTTPException(status_code=400, detail="Invalid bounding box")
+
+    rows = await db.run_sync(saved_locations_in_bbox, user.id, bbox.south, bbox.west, bbox.north, bbox.east)
+    return [saved_location_to_dict(loc, list_ids) for loc, list_ids in rows]
+
+@router.get("/nearby", response_model=list[NearbyLocationOut])
+async def locations_nearby(
+    params: NearbyParams = Depends(),
+    user: Principal = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
+    rows = await db.run_sync(saved_locations_in_bbox, user.id, *bbox_around(params.lat, params.long, params.radius))
+
+    order, distances = nearest_first(
+        params.lat, params.long,
+        [loc.latitude for loc, _ in rows], [loc.longitude for loc, _ in rows],
+        radius_m=params.radius,
+    )
+    return [
+        {**saved_location_to_dict(*rows[i]), "distance": float(d)}
+        for i, d in zip(order, distances)
+    ]
+
+
+def _cluster_scope(db: Session, user_id: int, list_id: int | None) -> tuple:
+    if list_id is not None:
+        lst = get_owned_list(db, list_id, user_id)
+        # List ids are never reused, so a recreated list can't pick up a deleted one's tiles
+        return ("list", lst.id, lst.version)
+
+    return ("user", user_id, *user_lists_version(db, user_id))
+
+def _compute_tile_clusters(db: Session, user_id: int, list_id: int | None, tiles: list, zoom: int) -> dict:
+    bounds = [tile_bounds(x, y, zoom) for x, y in tiles]
+    query = (
+        db.query(Location.id, Location.latitude, Location.longitude)
+        .join(ListLocation, ListLocation.location_id == Location.id)
+        .join(List, List.id == ListLocation.list_id)
+        .filter(List.user_id == user_id)
+    )
+    if list_id is not None:
+        query = query.filter(List.id == list_id)
+    query = filter_bbox(
+        db, query,
+        min(b[0] for b in bounds), min(b[1] for b in bounds),
+        max(b[2] for b in bounds), max(b[3] for b in bounds),
+    )
+    points = query.distinct().all()
+
+    by_tile = cluster_points([p[0] for p in points], [p[1] for p in points], [p[2] for p in points], zoom)
+    wanted = {tile: by_tile.get(tile, []) for tile in tiles}
+    rep_ids = [c["location_id"] for clusters in wanted.values() for c in clusters]
+    places = {loc.id: location_to_dict(loc) for loc in db.query(Location).filter(Location.id.in_(rep_ids))}
+
+    return {
+        tile: [
+            {"count": c["count"], "latitude": c["latitude"], "longitude": c["longitude"], "place": places[c["location_id"]]}
+            for c in clusters
+        ]
+        for tile, clusters in wanted.items()
+    }
+
+def _get_clusters(db: Session, user_id: int, params: ClusterParams) -> list[dict]:
+    tiles = tiles_for_bbox(params.south, params.west, params.north, params.east, params.zoom)
+    if len(tiles) > MAX_CLUSTER_TILES:
+        raise HTTPException(status_code=400, detail="Bounding box too large for zoom level")
+
+    scope = _cluster_scope(db, user_id, params.list_id)
+    results = {}
+    missing = []
+    for x, y in tiles:
+        cached = cluster_cache.get((scope, params.zoom, x, y))
+        if cached is None:
+            missing.append((x, y))
+        else:
+            results[(x, y)] = cached
+
+    if missing:
+        for (x, y), clusters in _compute_tile_clusters(db, user_id, params.list_id, missing, params.zoom).items():
+            cluster_cache.set((scope, params.zoom, x, y), clusters)
+            results[(x, y)] = clusters
+
+    return [c for tile in tiles for c in results[tile]]
+
+@router.get("/clusters", response_model=list[Cluster])
+async def location_clusters(
+    params: ClusterParams = Depends(),
+    user: Principal = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
+    if params.south > params.north or params.west > params.east:
+        raise HTTPException(status_code=400, detail="Invalid bounding box")
+
+    return await db.run_sync(_get_clusters, user.id, params)
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.database import DbSession
+from app.schemas.location import PlaceIdsBody, PlaceDetailsResult, PlaceDetailsResponse
+from app.core.security import get_db, get_current_user, get_session_opener, Principal
+from app.utils.place_details import get_place_details, details_refresher
+
+router = APIRouter(prefix="/places", tags=["Places"])
+
+@router.post("/details", response_model=PlaceDetailsResponse)
+async def place_details_batch(
+    data: PlaceIdsBody,
+    user: Principal = Depends(get_current_user),
+    db: DbSession = Depends(get_db),
+    open_session=Depends(get_session_opener)
+):
+    details = await get_place_details(db, open_session, data.place_ids)
+    return {"results": [{"place_id": place_id, "details": d} for place_id, d in details.items()]}
+
+@router.get("/details-stats")
+def details_stats():
+    return details_refresher.stats()
+
+@router.get("/{place_id}/details", response_model=PlaceDetailsResult)
+async def place_details(
+    place_id: str,
+    user: Principal = Depends(get_current_user),
+    db: DbSession = Depends(get_db),
+    open_session=Depends(get_session_opener)
+):
+    details = (await get_place_details(db, open_session, [place_id]))[place_id]
+    if details is None:
+        # The fetch failed and there's no stored copy to fall back on; worth retrying
+        raise HTTPException(status_code=502, detail="Place details could not be fetched")
+    if not details:
+        raise HTTPException(status_code=404, detail="Geoapify has no details for this place")
+    return {"place_id": place_id, "details": details}
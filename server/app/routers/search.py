@@ -1,10 +1,30 @@
-from fastapi import APIRouter, Depends
-from app.schemas.location import SearchParams
-from app.utils.geoapify import search_query
+from fastapi import APIRouter, Depends, Request
+from app.core.config import SEARCH_PREFETCH
+from app.core.compression import Payload, payload_response
+from app.core.responses import dumps
+from app.routers.autocomplete import client_key
+from app.schemas.location import SearchParams, SearchResponse
+from app.utils.geoapify import search_query, search_cache, search_cache_key, search_payloads
+from app.utils.prefetch import search_prefetcher
 
 router = APIRouter(prefix="/searchQuery", tags=["Search"])
 
-@router.get("")
-def search(params: SearchParams = Depends()):
-    results = search_query(params.query, params.lat, params.long, 50)
-    return {"results": results}
+@router.get("", response_model=SearchResponse)
+async def search(request: Request, params: SearchParams = Depends()):
+    results = await search_query(params.query, params.lat, params.long, 50)
+    if SEARCH_PREFETCH:
+        # Warm the cells around this one so a search after panning the map is a cache hit
+        client = client_key(request) or request.client.host
+        search_prefetcher.schedule(client, params.query, params.lat, params.long, 50)
+
+    key = search_cache_key(params.query, params.lat, params.long, 50)
+    cached = search_payloads.get(key)
+    # Only reuse the payload while the cache still holds the very results it was built from
+    if cached is None or cached[0] is not results:
+        cached = (results, Payload(dumps({"results": results})))
+        search_payloads.set(key, cached)
+    return await payload_response(request, cached[1])
+
+@router.get("/cache-stats")
+def cache_stats():
+    return {**search_cache.stats(), "prefetch": search_prefetcher.stats()}
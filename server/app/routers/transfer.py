@@ -0,0 +1,157 @@
+from collections import Counter
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.database import DbSession
+from app.models import List, Location, ListLocation
+from app.schemas.list import ImportResult
+from app.core.security import get_db, get_current_user, Principal
+from app.routers.lists import STREAM_BATCH_SIZE, add_locations_to_list, bump_lists_version, get_owned_list
+from app.utils.transfer import GEOJSON_HEAD, GEOJSON_TAIL, csv_chunk, features_chunk, import_batches
+
+# Registered ahead of the lists router so /lists/export and /lists/import aren't taken for a list_id
+router = APIRouter(prefix="/lists", tags=["Lists"])
+
+IMPORT_BATCH_SIZE = 500
+# Where imported rows without a list name go
+DEFAULT_IMPORT_LIST = "Imported"
+
+MEDIA_TYPES = {"geojson": "application/geo+json", "csv": "text/csv; charset=utf-8"}
+ExportFormat = Literal["geojson", "csv"]
+
+def export_stmt(user_id: int, list_id: int | None = None):
+    """One flat row per saved place, grouped by list in insertion order."""
+    stmt = (
+        select(
+            List.name.label("list"),
+            Location.name,
+            Location.address,
+            Location.latitude,
+            Location.longitude,
+            Location.place_id,
+            Location.category,
+        )
+        .join(ListLocation, ListLocation.list_id == List.id)
+        .join(Location, Location.id == ListLocation.location_id)
+        .where(List.user_id == user_id)
+    )
+    if list_id is not None:
+        stmt = stmt.where(List.id == list_id)
+    return stmt.order_by(List.id, ListLocation.id)
+
+async def stream_export(db: DbSession, stmt, fmt: str):
+    # A server-side cursor read STREAM_BATCH_SIZE rows at a time keeps memory flat
+    result = await db.stream(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+    if fmt == "geojson":
+        yield GEOJSON_HEAD
+        sep = b""
+        async for rows in result.partitions():
+            yield sep + features_chunk(rows)
+            sep = b","
+        yield GEOJSON_TAIL
+    else:
+        yield csv_chunk([], header=True)
+        async for rows in result.partitions():
+            yield csv_chunk(rows)
+
+def export_response(db: DbSession, stmt, fmt: str, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        stream_export(db, stmt, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
+
+@router.get("/export")
+async def export_lists(
+    format: ExportFormat = "geojson",
+    user: Principal = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
+    return export_response(db, export_stmt(user.id), format, "lists")
+
+@router.get("/{list_id}/export")
+async def export_list(
+    list_id: int,
+    format: ExportFormat = "geojson",
+    user: Principal = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
+    lst = await db.run_sync(get_owned_list, list_id, user.id)
+    return export_response(db, export_stmt(user.id, lst.id), format, f"list-{lst.id}")
+
+
+def _resolve_list(db: Session, user_id: int, name: str, known: dict[str, int]) -> tuple[int, bool]:
+    """(list id, created) for the user's list called `name`, creating it if needed."""
+    if name in known:
+        return known[name], False
+    list_id = db.scalar(select(List.id).where(List.user_id == user_id, List.name == name).order_by(List.id))
+    created = list_id is None
+    if created:
+        new_list = List(name=name, user_id=user_id)
+        db.add(new_list)
+        bump_lists_version(db, user_id)
+        db.flush()
+        list_id = new_list.id
+    known[name] = list_id
+    return list_id, created
+
+def _import_batch(db: Session, user_id: int, list_id: int | None, batch: list, known: dict[str, int]) -> Counter:
+    counts = Counter()
+    groups = {}
+    for name, location in batch:
+        target = list_id
+        if target is None:
+            target, created = _resolve_list(db, user_id, name or DEFAULT_IMPORT_LIST, known)
+            counts["lists_created"] += created
+        groups.setdefault(target, []).append(location)
+
+    # Each list's share of the batch is one bulk add, committed on its own
+    for target, locations in groups.items():
+        counts.update(result["status"] for result in add_locations_to_list(db, user_id, target, locations))
+    return counts
+
+@router.post("/import", response_model=ImportResult)
+async def import_lists(
+    file: UploadFile,
+    format: ExportFormat | None = Query(None, description="Defaults to the file extension"),
+    list_id: int | None = Query(None, description="Import every row into this list instead of by each row's list name"),
+    user: Principal = Depends(get_current_user),
+    db: DbSession = Depends(get_db)
+):
+    fmt = format or next((f for f in MEDIA_TYPES if (file.filename or "").lower().endswith(f".{f}")), None)
+    if fmt is None and (file.filename or "").lower().endswith(".json"):
+        fmt = "geojson"
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Unknown file format; pass format=csv or format=geojson")
+    if list_id is not None:
+        await db.run_sync(get_owned_list, list_id, user.id)
+
+    report = {"invalid": 0, "errors": []}
+    batches = import_batches(file.file, fmt, IMPORT_BATCH_SIZE, report)
+    counts = Counter()
+    known = {}
+    while True:
+        # Parse off the event loop, one batch at a time
+        try:
+            batch = await run_in_threadpool(next, batches, None)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid {fmt} file after {counts['added']} added location(s): {exc}",
+            )
+        if batch is None:
+            break
+        counts.update(await db.run_sync(_import_batch, user.id, list_id, batch, known))
+
+    return {
+        "message": f"{counts['added']} location(s) imported",
+        "added": counts["added"],
+        "already_in_list": counts["already_in_list"],
+        "duplicates": counts["duplicate"],
+        "invalid": report["invalid"],
+        "lists_created": counts["lists_created"],
+        "errors": report["errors"],
+    }
@@ -0,0 +1,4 @@
+from pydantic import BaseModel
+
+class Message(BaseModel):
+    message: str
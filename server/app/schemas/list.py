@@ -1,4 +1,44 @@
 from pydantic import BaseModel
+from app.schemas.location import ListLocationOut, LocationOut
+from app.schemas.user import UserOut
 
 class ListCreate(BaseModel):
     name: str
+
+
+class ListSummary(BaseModel):
+    id: int
+    name: str
+    is_default: bool
+
+class ListCreated(BaseModel):
+    id: int
+    name: str
+    message: str
+
+class ListDetail(BaseModel):
+    id: int
+    name: str
+    locations: list[ListLocationOut]
+    is_default: bool
+    next_cursor: int | None = None
+
+class ImportResult(BaseModel):
+    message: str
+    added: int
+    already_in_list: int
+    duplicates: int
+    invalid: int
+    lists_created: int
+    errors: list[str]
+
+class BootstrapList(ListSummary):
+    count: int
+    # Only with locations=true; left out otherwise
+    locations: list[LocationOut] | None = None
+
+class Bootstrap(BaseModel):
+    user: UserOut
+    lists: list[BootstrapList]
+    # Every place saved in any list, without locations=true
+    place_ids: list[str] | None = None
@@ -8,7 +8,101 @@ class LocationCreate(BaseModel):
     place_id: str
     category: str | None = None
 
+class BulkLocationCreate(LocationCreate):
+    # Required here: a single item without one would fail the whole batch insert
+    category: str
+
+class LocationOut(BaseModel):
+    id: int
+    name: str
+    address: str
+    latitude: float
+    longitude: float
+    place_id: str
+    category: str | None = None
+
+class PlaceDetailsOut(BaseModel):
+    opening_hours: str | None = None
+    website: str | None = None
+    phone: str | None = None
+    email: str | None = None
+    categories: list[str] = []
+
+class PlaceDetailsResult(BaseModel):
+    place_id: str
+    details: PlaceDetailsOut | None
+
+class PlaceDetailsResponse(BaseModel):
+    results: list[PlaceDetailsResult]
+
+class ListLocationOut(LocationOut):
+    # Meters from the requested origin, when the list is sorted by distance
+    distance: float | None = None
+    # With details=true; None until Geoapify has answered for the place
+    details: PlaceDetailsOut | None = None
+
+class SavedLocationOut(LocationOut):
+    list_ids: list[int]
+
+class NearbyLocationOut(SavedLocationOut):
+    distance: float
+
+class ListStatus(BaseModel):
+    id: int
+    name: str
+    added: bool
+
+class BulkItemStatus(BaseModel):
+    place_id: str
+    status: str
+
+class BulkResult(BaseModel):
+    message: str
+    results: list[BulkItemStatus]
+
+class PlaceIdsBody(BaseModel):
+    place_ids: list[str] = Field(..., min_length=1, max_length=500)
+
 class SearchParams(BaseModel):
     query: str = Field(...)
     lat: str = Field(...)
     long: str = Field(...)
+
+class SearchResult(BaseModel):
+    name: str
+    address: str | None = None
+    latitude: float | None = None
+    longitude: float | None = None
+    place_id: str | None = None
+    category: str | None = None
+    score: float
+
+class SearchResponse(BaseModel):
+    results: list[SearchResult]
+
+class AutocompleteParams(BaseModel):
+    text: str = Field(..., min_length=1, max_length=200)
+    lat: str = Field(...)
+    long: str = Field(...)
+
+
+class BBoxParams(BaseModel):
+    south: float = Field(..., ge=-90, le=90)
+    west: float = Field(..., ge=-180, le=180)
+    north: float = Field(..., ge=-90, le=90)
+    east: float = Field(..., ge=-180, le=180)
+
+class ClusterParams(BBoxParams):
+    zoom: int = Field(..., ge=0, le=22)
+    list_id: int | None = None
+
+class Cluster(BaseModel):
+    count: int
+    latitude: float
+    longitude: float
+    place: LocationOut
+
+class NearbyParams(BaseModel):
+    lat: float = Field(..., ge=-90, le=90)
+    long: float = Field(..., ge=-180, le=180)
+    radius: float = Field(1000, gt=0, le=50000)
@@ -7,4 +7,13 @@ class RegisterCreds(BaseModel):
 
 class LoginCreds(BaseModel):
     username: str
-    password: str
\ No newline at end of file
+    password: str
+
+class UserOut(BaseModel):
+    id: int
+    username: str
+
+
+class AuthResponse(BaseModel):
+    message: str
+    user: UserOut
@@ -0,0 +1,305 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from anyio import to_thread
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Bounded in-process LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key, default=None):
+        """Like `get`, but leaves the hit/miss counters and the LRU order alone."""
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+        if item is _MISSING or item[1] <= time.monotonic():
+            return default
+        return item[0]
+
+    def set(self, key, value, ttl: float | None = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate) -> int:
+        """Drop every entry whose value matches `predicate`; returns how many were dropped."""
+        with self._lock:
+            keys = [k for k, (v, _) in self._data.items() if predicate(v)]
+            for k in keys:
+                del self._data[k]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SQLiteCache:
+    """JSON values in a SQLite file, shared by every worker process on the host."""
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        row = self._conn().execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return default
+        if row[1] <= time.time():
+            self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self.hits += 1
+        return json.loads(row[0])
+
+    def peek(self, key, default=None):
+        """Like `get`, but leaves the counters and expired rows alone."""
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def set(self, key, value, ttl: float | None = None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), expires_at),
+        )
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def fresh_items(self, limit: int) -> list[tuple]:
+        """(key, value, seconds left) for up to `limit` unexpired entries, longest-lived first."""
+        now = time.time()
+        rows = self._conn().execute(
+            "SELECT key, value, expires_at FROM cache WHERE expires_at > ? ORDER BY expires_at DESC LIMIT ?",
+            (now, limit),
+        ).fetchall()
+        return [(key, json.loads(value), expires_at - now) for key, value, expires_at in rows]
+
+    def prune(self) -> int:
+        cur = self._conn().execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        self.expirations += cur.rowcount
+        return cur.rowcount
+
+    def clear(self):
+        self._conn().execute("DELETE FROM cache")
+        self.hits = self.misses = self.expirations = 0
+
+    def stats(self) -> dict:
+        size = self._conn().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        return {
+            "size": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expirations": self.expirations,
+        }
+
+
+class TieredCache:
+    """In-process LRU in front of an optional SQLite tier.
+
+    Disk hits are promoted into memory so repeated lookups stay in-process.
+    """
+
+    def __init__(self, memory: TTLCache, disk: SQLiteCache | None = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key, default=None):
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key, _MISSING)
+            if value is not _MISSING:
+                self.memory.set(key, value)
+                return value
+        return default
+
+    def peek(self, key, default=None):
+        """Like `get`, but counts nothing and doesn't promote disk entries into memory."""
+        value = self.memory.peek(key, _MISSING)
+        if value is _MISSING and self.disk is not None:
+            value = self.disk.peek(key, _MISSING)
+        return default if value is _MISSING else value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def warm(self) -> int:
+        """Load the freshest disk entries into memory, up to its size; returns how many."""
+        if self.disk is None:
+            return 0
+        # Nothing else deletes expired entries that are never read again, so the file would only grow
+        self.disk.prune()
+        items = self.disk.fresh_items(self.memory.maxsize)
+        # Oldest first, so the longest-lived entries end up most recently used
+        for key, value, ttl in reversed(items):
+            self.memory.set(key, value, ttl=min(ttl, self.memory.ttl))
+        return len(items)
+
+    async def aget(self, key, default=None):
+        """Like `get`, but keeps SQLite reads off the event loop."""
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.disk is not None:
+            value = await to_thread.run_sync(self.disk.get, key, _MISSING)
+            if value is not _MISSING:
+                self.memory.set(key, value)
+                return value
+        return default
+
+    async def apeek(self, key, default=None):
+        """Like `peek`, but keeps SQLite reads off the event loop."""
+        value = self.memory.peek(key, _MISSING)
+        if value is _MISSING and self.disk is not None:
+            value = await to_thread.run_sync(self.disk.peek, key, _MISSING)
+        return default if value is _MISSING else value
+
+    async def aset(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            await to_thread.run_sync(self.disk.set, key, value)
+
+    def delete(self, key):
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> dict:
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one awaited task."""
+
+    def __init__(self):
+        self._inflight: dict = {}
+
+    async def do(self, key, fn, *args):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield so one caller disconnecting doesn't cancel the call for everyone else
+        return await asyncio.shield(task)
+
+    def __len__(self):
+        return len(self._inflight)
+
+
+class Superseded(Exception):
+    """Raised to a LatestOnly caller whose call was cancelled by a newer one."""
+
+
+class LatestOnly:
+    """Keeps one running call per key; starting a new call cancels the one in progress."""
+
+    def __init__(self):
+        self._running: dict = {}
+
+    async def run(self, key, fn, *args):
+        previous = self._running.get(key)
+        if previous is not None:
+            previous.cancel()
+        task = asyncio.ensure_future(fn(*args))
+        self._running[key] = task
+        try:
+            return await task
+        except asyncio.CancelledError:
+            # Our own caller being cancelled still propagates as a cancellation
+            if self._running.get(key) is not task:
+                raise Superseded() from None
+            raise
+        finally:
+            if self._running.get(key) is task:
+                del self._running[key]
+
+    def __len__(self):
+        return len(self._running)
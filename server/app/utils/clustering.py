@@ -0,0 +1,81 @@
+import math
+
+# Web Mercator stops here; tiles don't cover the poles
+MAX_LATITUDE = 85.05112878
+# Grid cells per tile side; 256px tiles give roughly 64px clusters
+CELLS_PER_TILE = 4
+
+
+def _clamp_lat(lat: float) -> float:
+    return max(min(lat, MAX_LATITUDE), -MAX_LATITUDE)
+
+
+def tile_x(lon: float, zoom: int) -> int:
+    n = 1 << zoom
+    return min(max(int((lon + 180.0) / 360.0 * n), 0), n - 1)
+
+
+def tile_y(lat: float, zoom: int) -> int:
+    n = 1 << zoom
+    phi = math.radians(_clamp_lat(lat))
+    y = (1.0 - math.asinh(math.tan(phi)) / math.pi) / 2.0 * n
+    return min(max(int(y), 0), n - 1)
+
+
+def tile_bounds(x: int, y: int, zoom: int) -> tuple[float, float, float, float]:
+    """(south, west, north, east) of a slippy-map tile."""
+    n = 1 << zoom
+
+    def lat(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return lat(y + 1), x / n * 360.0 - 180.0, lat(y), (x + 1) / n * 360.0 - 180.0
+
+
+def tiles_for_bbox(south: float, west: float, north: float, east: float, zoom: int) -> list[tuple[int, int]]:
+    xs = range(tile_x(west, zoom), tile_x(east, zoom) + 1)
+    # Tile rows count down from the north
+    ys = range(tile_y(north, zoom), tile_y(south, zoom) + 1)
+    return [(x, y) for x in xs for y in ys]
+
+
+def cluster_points(ids, lats, lons, zoom: int) -> dict[tuple[int, int], list[dict]]:
+    """Bucket points into grid cells CELLS_PER_TILE times finer than the zoom's tiles.
+
+    Returns clusters grouped by the tile they fall in. Each cluster has a count, a
+    centroid and `location_id`: the id of the point nearest that centroid.
+    """
+    # Deferred like in app.utils.geo, to keep numpy off the startup path
+    import numpy as np
+
+    ids = np.asarray(ids, dtype=np.int64)
+    if ids.size == 0:
+        return {}
+    lats = np.clip(np.asarray(lats, dtype=np.float64), -MAX_LATITUDE, MAX_LATITUDE)
+    lons = np.asarray(lons, dtype=np.float64)
+
+    cells = (1 << zoom) * CELLS_PER_TILE
+    cx = np.clip(((lons + 180.0) / 360.0 * cells).astype(np.int64), 0, cells - 1)
+    mercator_y = (1.0 - np.arcsinh(np.tan(np.radians(lats))) / np.pi) / 2.0
+    cy = np.clip((mercator_y * cells).astype(np.int64), 0, cells - 1)
+
+    keys, inverse = np.unique(cx * cells + cy, return_inverse=True)
+    counts = np.bincount(inverse)
+    mean_lat = np.bincount(inverse, weights=lats) / counts
+    mean_lon = np.bincount(inverse, weights=lons) / counts
+
+    # Representative: sort by (cluster, squared distance to centroid), take each cluster's first row
+    dist = (lats - mean_lat[inverse]) ** 2 + (lons - mean_lon[inverse]) ** 2
+    order = np.lexsort((dist, inverse))
+    first = order[np.searchsorted(inverse[order], np.arange(keys.size))]
+
+    tiles: dict[tuple[int, int], list[dict]] = {}
+    for key, count, lat, lon, rep in zip(keys, counts, mean_lat, mean_lon, ids[first]):
+        tile = (int(key // cells) // CELLS_PER_TILE, int(key % cells) // CELLS_PER_TILE)
+        tiles.setdefault(tile, []).append({
+            "count": int(count),
+            "latitude": float(lat),
+            "longitude": float(lon),
+            "location_id": int(rep),
+        })
+    return tiles
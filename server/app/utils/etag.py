@@ -0,0 +1,25 @@
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    return '"' + "-".join(str(p) for p in parts) + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison against If-None-Match, as RFC 9110 specifies for GET."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
+
+
+def etag_headers(etag: str) -> dict:
+    # Let browsers keep the payload but revalidate it on every use
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
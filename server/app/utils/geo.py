@@ -0,0 +1,44 @@
+import math
+from typing import TYPE_CHECKING
+
+# numpy is imported inside the functions that use it; it's one of the slowest imports at startup
+if TYPE_CHECKING:
+    import numpy as np
+
+EARTH_RADIUS_M = 6_371_008.8
+METERS_PER_DEGREE = 111_320.0
+
+def bbox_around(lat: float, lon: float, radius_m: float) -> tuple[float, float, float, float]:
+    """(south, west, north, east) box that fully contains the circle."""
+    dlat = radius_m / METERS_PER_DEGREE
+    dlon = radius_m / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+    return (
+        max(lat - dlat, -90.0),
+        max(lon - dlon, -180.0),
+        min(lat + dlat, 90.0),
+        min(lon + dlon, 180.0),
+    )
+
+def haversine_many(lat: float, lon: float, lats, lons) -> "np.ndarray":
+    """Great-circle distances in meters from one point to arrays of points, in one pass."""
+    import numpy as np
+
+    phi1 = math.radians(lat)
+    phi2 = np.radians(np.asarray(lats, dtype=np.float64))
+    dlmb = np.radians(np.asarray(lons, dtype=np.float64) - lon)
+    a = np.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def nearest_first(lat: float, lon: float, lats, lons, radius_m: float | None = None, limit: int | None = None):
+    """(indices, distances) of the points ordered by distance, optionally within a radius / top N."""
+    import numpy as np
+
+    distances = haversine_many(lat, lon, lats, lons)
+    indices = np.arange(distances.size)
+    if radius_m is not None:
+        indices = indices[distances <= radius_m]
+    if limit is not None and limit < indices.size:
+        # Partial select of the N nearest before the full sort
+        indices = indices[np.argpartition(distances[indices], limit - 1)[:limit]]
+    indices = indices[np.argsort(distances[indices], kind="stable")]
+    return indices, distances[indices]
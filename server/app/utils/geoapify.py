@@ -1,23 +1,100 @@
-import requests
+import time
+import httpx
 from fastapi import HTTPException
-from app.core.config import API_KEY
+from app.core.config import (
+    API_KEY,
+    GEOAPIFY_BASE_URL,
+    GEOAPIFY_TIMEOUT,
+    GEOAPIFY_MAX_CONNECTIONS,
+    SEARCH_CACHE_SIZE,
+    SEARCH_CACHE_TTL,
+    SEARCH_CACHE_CELL,
+    SEARCH_CACHE_DB,
+    AUTOCOMPLETE_LIMIT,
+    AUTOCOMPLETE_CACHE_SIZE,
+    AUTOCOMPLETE_CACHE_TTL,
+    AUTOCOMPLETE_CELL,
+)
+from app.core.metrics import upstream_latency
+from app.utils.cache import TTLCache, SQLiteCache, TieredCache, SingleFlight
 
-def search_query(query: str, lat: str, long: str, limit: int):
-    base_url = "https://api.geoapify.com/v1/geocode/search"
-    params = {
+search_cache = TieredCache(
+    TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL),
+    SQLiteCache(SEARCH_CACHE_DB, ttl=SEARCH_CACHE_TTL) if SEARCH_CACHE_DB else None,
+)
+search_flight = SingleFlight()
+# key -> (results, Payload) so cache hits reuse the serialized and compressed response
+search_payloads = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+autocomplete_cache = TTLCache(maxsize=AUTOCOMPLETE_CACHE_SIZE, ttl=AUTOCOMPLETE_CACHE_TTL)
+
+_client: httpx.AsyncClient | None = None
+
+def get_client() -> httpx.AsyncClient:
+    """Shared keep-alive client, created on first use and reused for the app lifetime."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=GEOAPIFY_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=GEOAPIFY_MAX_CONNECTIONS,
+                max_keepalive_connections=GEOAPIFY_MAX_CONNECTIONS,
+            ),
+        )
+    return _client
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def quantize(value: str | float, cell: float = SEARCH_CACHE_CELL) -> str:
+    return f"{round(float(value) / cell) * cell:.6f}"
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+def search_cache_key(query: str, lat: str, long: str, limit: int) -> str:
+    return f"{normalize(query)}|{quantize(lat)}|{quantize(long)}|{limit}"
+
+async def search_query(query: str, lat: str, long: str, limit: int):
+    key = search_cache_key(query, lat, long, limit)
+    results = await search_cache.aget(key)
+    if results is None:
+        results = await search_flight.do(key, load_search, key, query, lat, long, limit)
+    return results
+
+async def load_search(key: str, query: str, lat: str, long: str, limit: int):
+    """Fetch a search from Geoapify and cache it under `key`; callers coalesce it through search_flight."""
+    results = await fetch_search(query, lat, long, limit)
+    await search_cache.aset(key, results)
+    return results
+
+async def fetch_search(query: str, lat: str, long: str, limit: int):
+    data = await _get("geocode/search", {
         "text": query,
         "bias": f"proximity:{long},{lat}|circle:{long},{lat},5000",
         "format": "json",
         "limit": limit,
         "apiKey": API_KEY,
-    }
+    })
+    return parse_results(data)
 
-    response = requests.get(base_url, params=params)
+async def _get(endpoint: str, params: dict, version: str = "v1") -> dict:
+    start = time.perf_counter()
+    try:
+        response = await get_client().get(f"{GEOAPIFY_BASE_URL}/{version}/{endpoint}", params=params)
+    except httpx.HTTPError:
+        upstream_latency.observe(time.perf_counter() - start, endpoint, "error")
+        raise HTTPException(status_code=500, detail="Failed to fetch data")
+    upstream_latency.observe(time.perf_counter() - start, endpoint, str(response.status_code))
 
     if response.status_code != 200:
         raise HTTPException(status_code=500, detail="Failed to fetch data")
 
-    data = response.json()
+    return response.json()
+
+def parse_results(data: dict) -> list[dict]:
     results = []
     for feature in data.get("results", []):
         name = feature.get("name") or feature.get("address_line1") or "Unknown"
@@ -42,3 +119,74 @@ def search_query(query: str, lat: str, long: str, limit: int):
     results.sort(key=lambda x: x["score"], reverse=True)
 
     return results
+
+def autocomplete_area(lat: str, long: str) -> str:
+    return f"{quantize(lat, AUTOCOMPLETE_CELL)}|{quantize(long, AUTOCOMPLETE_CELL)}"
+
+def matches_prefix(text: str, result: dict) -> bool:
+    """True when every word of `text` starts some word of the result's name or address."""
+    words = f"{result.get('name') or ''} {result.get('address') or ''}".lower().replace(",", " ").split()
+    return all(any(word.startswith(part) for word in words) for part in text.split())
+
+def cached_completions(area: str, text: str) -> list[dict] | None:
+    """Completions for `text` from the cache, exact or derived from a shorter prefix.
+
+    A shorter prefix's results can only be filtered down when they were complete
+    (fewer than the limit came back), otherwise a match may have been cut off.
+    """
+    entry = autocomplete_cache.get(f"{area}|{text}")
+    if entry is not None:
+        return entry["results"]
+    for end in range(len(text) - 1, 0, -1):
+        if text[end - 1] == " ":
+            continue
+        # Peeked so probing shorter prefixes doesn't count as misses
+        entry = autocomplete_cache.peek(f"{area}|{text[:end]}")
+        if entry is not None and entry["complete"]:
+            results = [r for r in entry["results"] if matches_prefix(text, r)]
+            # A subset of a complete set is complete too
+            autocomplete_cache.set(f"{area}|{text}", {"results": results, "complete": True})
+            return results
+    return None
+
+async def autocomplete_query(text: str, lat: str, long: str):
+    text = normalize(text)
+    area = autocomplete_area(lat, long)
+    results = cached_completions(area, text)
+    if results is None:
+        results = await fetch_autocomplete(text, lat, long, AUTOCOMPLETE_LIMIT)
+        autocomplete_cache.set(f"{area}|{text}", {"results": results, "complete": len(results) < AUTOCOMPLETE_LIMIT})
+    return results
+
+async def fetch_autocomplete(text: str, lat: str, long: str, limit: int):
+    data = await _get("geocode/autocomplete", {
+        "text": text,
+        "bias": f"proximity:{long},{lat}",
+        "format": "json",
+        "limit": limit,
+        "apiKey": API_KEY,
+    })
+    return parse_results(data)
+
+async def fetch_place_details(place_id: str) -> dict:
+    data = await _get("place-details", {"id": place_id, "apiKey": API_KEY}, version="v2")
+    return parse_details(data)
+
+def parse_details(data: dict) -> dict:
+    """The fields we keep from a place-details response; {} when Geoapify has nothing on the place."""
+    features = data.get("features") or []
+    # The response can also describe the surrounding building or area; prefer the place itself
+    feature = next((f for f in features if f.get("properties", {}).get("feature_type") == "details"), None)
+    if feature is None and features:
+        feature = features[0]
+    if feature is None:
+        return {}
+    props = feature.get("properties", {})
+    contact = props.get("contact") or {}
+    return {
+        "opening_hours": props.get("opening_hours"),
+        "website": props.get("website"),
+        "phone": contact.get("phone"),
+        "email": contact.get("email"),
+        "categories": props.get("categories") or [],
+    }
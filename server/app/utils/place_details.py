@@ -0,0 +1,144 @@
+import asyncio
+import time
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import Session
+from app.core.config import (
+    PLACE_DETAILS_TTL,
+    PLACE_DETAILS_MAX_STALE,
+    PLACE_DETAILS_BATCH_SIZE,
+    PLACE_DETAILS_CONCURRENCY,
+)
+from app.models import PlaceDetails
+from app.utils.cache import SingleFlight
+from app.utils.geoapify import fetch_place_details
+
+# Stays well under SQLite's bound-parameter limit
+LOAD_CHUNK_SIZE = 500
+
+details_flight = SingleFlight()
+
+
+def _load_details(db: Session, place_ids: list[str]) -> dict[str, tuple[dict, float]]:
+    """place_id -> (details, fetched_at) for the places we have stored."""
+    stored = {}
+    for i in range(0, len(place_ids), LOAD_CHUNK_SIZE):
+        rows = db.execute(
+            select(PlaceDetails.place_id, PlaceDetails.data, PlaceDetails.fetched_at)
+            .where(PlaceDetails.place_id.in_(place_ids[i:i + LOAD_CHUNK_SIZE]))
+        )
+        stored.update((place_id, (data, fetched_at)) for place_id, data, fetched_at in rows)
+    return stored
+
+
+def _store_details(db: Session, details: dict[str, dict]):
+    insert = sqlite.insert
+    if db.get_bind().dialect.name == "postgresql":
+        # Imported here: the postgresql dialect adds ~100 ms to startup
+        from sqlalchemy.dialects import postgresql
+        insert = postgresql.insert
+    now = time.time()
+    stmt = insert(PlaceDetails).values([
+        {"place_id": place_id, "data": data, "fetched_at": now} for place_id, data in details.items()
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["place_id"],
+        set_={"data": stmt.excluded.data, "fetched_at": stmt.excluded.fetched_at},
+    ))
+    db.commit()
+
+
+async def fetch_details_batch(place_ids: list[str]) -> dict[str, dict]:
+    """Details for each place Geoapify answered for, fetched at most PLACE_DETAILS_CONCURRENCY at a time."""
+    semaphore = asyncio.Semaphore(PLACE_DETAILS_CONCURRENCY)
+
+    async def fetch(place_id: str):
+        async with semaphore:
+            try:
+                # Coalesced with any request or refresh already fetching the same place
+                return place_id, await details_flight.do(place_id, fetch_place_details, place_id)
+            except HTTPException:
+                return place_id, None
+
+    results = await asyncio.gather(*[fetch(place_id) for place_id in place_ids])
+    return {place_id: details for place_id, details in results if details is not None}
+
+
+class DetailsRefresher:
+    """Refetches stale place details in background tasks, one task per batch."""
+
+    def __init__(self):
+        self.refreshed = 0
+        self._refreshing: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+    def schedule(self, open_session, place_ids: list[str]):
+        place_ids = [p for p in place_ids if p not in self._refreshing][:PLACE_DETAILS_BATCH_SIZE]
+        if not place_ids:
+            return
+        self._refreshing.update(place_ids)
+        task = asyncio.ensure_future(self._refresh(open_session, place_ids))
+        # The loop only keeps weak references to tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, open_session, place_ids: list[str]):
+        try:
+            details = await fetch_details_batch(place_ids)
+            if details:
+                async with open_session() as db:
+                    await db.run_sync(_store_details, details)
+                self.refreshed += len(details)
+        except Exception:
+            # Best effort: the stale copy keeps being served and the next read retries
+            pass
+        finally:
+            self._refreshing.difference_update(place_ids)
+
+    async def join(self):
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def cancel(self):
+        for task in self._tasks:
+            task.cancel()
+
+    def stats(self) -> dict:
+        return {"pending": len(self._tasks), "refreshing": len(self._refreshing), "refreshed": self.refreshed}
+
+
+details_refresher = DetailsRefresher()
+
+
+async def get_place_details(db, open_session, place_ids: list[str]) -> dict[str, dict | None]:
+    """place_id -> details (None when unavailable), stale-while-revalidate.
+
+    Stored details are served as they are, and the stale ones are refreshed in the
+    background. Places never fetched, or too stale to serve, are fetched before
+    returning, up to PLACE_DETAILS_BATCH_SIZE per call. The rest come back as None
+    this time and are fetched in the background.
+    """
+    place_ids = list(dict.fromkeys(place_ids))
+    stored = await db.run_sync(_load_details, place_ids)
+    now = time.time()
+
+    missing, stale = [], []
+    for place_id in place_ids:
+        age = now - stored[place_id][1] if place_id in stored else None
+        if age is None or age > PLACE_DETAILS_TTL + PLACE_DETAILS_MAX_STALE:
+            missing.append(place_id)
+        elif age > PLACE_DETAILS_TTL:
+            stale.append(place_id)
+
+    fetched = await fetch_details_batch(missing[:PLACE_DETAILS_BATCH_SIZE]) if missing else {}
+    if fetched:
+        await db.run_sync(_store_details, fetched)
+    if stale or len(missing) > PLACE_DETAILS_BATCH_SIZE:
+        details_refresher.schedule(open_session, stale + missing[PLACE_DETAILS_BATCH_SIZE:])
+
+    # A failed fetch still falls back to whatever (too stale) copy we have
+    return {
+        place_id: fetched[place_id] if place_id in fetched else stored.get(place_id, (None, 0))[0]
+        for place_id in place_ids
+    }
@@ -0,0 +1,104 @@
+import asyncio
+import time
+from app.core.config import (
+    SEARCH_CACHE_CELL,
+    SEARCH_PREFETCH_CLIENT_BUDGET,
+    SEARCH_PREFETCH_GLOBAL_BUDGET,
+    SEARCH_PREFETCH_CONCURRENCY,
+)
+from app.utils.cache import TTLCache
+from app.utils.geoapify import search_cache, search_cache_key, search_flight, load_search, quantize
+
+# Offsets, in cells, of the ring around a search; nearest (edge-sharing) cells first
+NEIGHBOURS = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+class TokenBucket:
+    """Per-key budget refilling at `per_minute` tokens a minute, up to `per_minute` banked."""
+
+    def __init__(self, per_minute: float, maxkeys: int = 10_000):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        # Idle buckets are full again after a minute, so they can expire then
+        self._buckets = TTLCache(maxsize=maxkeys, ttl=60)
+
+    def take(self, key=None) -> bool:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+        allowed = tokens >= 1
+        self._buckets.set(key, (tokens - 1 if allowed else tokens, now))
+        return allowed
+
+
+class SearchPrefetcher:
+    """Warms the search cache for the cells around a search, in background tasks."""
+
+    def __init__(self, client_budget: float, global_budget: float, concurrency: int, cell: float = SEARCH_CACHE_CELL):
+        self.client_budget = TokenBucket(client_budget)
+        self.global_budget = TokenBucket(global_budget, maxkeys=1)
+        self.concurrency = concurrency
+        self.cell = cell
+        self.fetched = 0
+        self.skipped = 0
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def schedule(self, client: str, query: str, lat: str, long: str, limit: int):
+        task = asyncio.ensure_future(self._prefetch(client, query, lat, long, limit))
+        # The loop only keeps weak references to tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def neighbours(self, lat: str, long: str) -> list[tuple[str, str]]:
+        centre_lat, centre_long = float(quantize(lat, self.cell)), float(quantize(long, self.cell))
+        return [
+            (f"{centre_lat + dy * self.cell:.6f}", f"{centre_long + dx * self.cell:.6f}")
+            for dy, dx in NEIGHBOURS
+            if -90 <= centre_lat + dy * self.cell <= 90 and -180 <= centre_long + dx * self.cell <= 180
+        ]
+
+    async def _prefetch(self, client: str, query: str, lat: str, long: str, limit: int):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # A semaphore is bound to the loop it first waits on
+            self._semaphore, self._loop = asyncio.Semaphore(self.concurrency), loop
+        cold = []
+        for cell_lat, cell_long in self.neighbours(lat, long):
+            key = search_cache_key(query, cell_lat, cell_long, limit)
+            # Peeked so probing doesn't skew the cache's hit/miss counts or fill the memory tier
+            if await search_cache.apeek(key) is not None:
+                continue
+            # Only upstream calls are charged against the budgets
+            if self.client_budget.take(client) and self.global_budget.take():
+                cold.append((key, cell_lat, cell_long))
+            else:
+                self.skipped += 1
+        await asyncio.gather(*[self._fetch(key, query, cell_lat, cell_long, limit) for key, cell_lat, cell_long in cold])
+
+    async def _fetch(self, key: str, query: str, lat: str, long: str, limit: int):
+        async with self._semaphore:
+            try:
+                # Known cold, so skip search_query's cache lookup; still coalesced with live searches
+                await search_flight.do(key, load_search, key, query, lat, long, limit)
+                self.fetched += 1
+            except Exception:
+                # Best effort: a failed prefetch just leaves that cell cold
+                pass
+
+    async def join(self):
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def cancel(self):
+        for task in self._tasks:
+            task.cancel()
+
+    def stats(self) -> dict:
+        return {"pending": len(self._tasks), "fetched": self.fetched, "skipped": self.skipped}
+
+
+search_prefetcher = SearchPrefetcher(
+    SEARCH_PREFETCH_CLIENT_BUDGET, SEARCH_PREFETCH_GLOBAL_BUDGET, SEARCH_PREFETCH_CONCURRENCY
+)
@@ -0,0 +1,141 @@
+import codecs
+import csv
+import io
+import json
+import re
+from pydantic import ValidationError
+from app.core.responses import dumps
+from app.schemas.location import LocationCreate
+
+CSV_FIELDS = ["list", "name", "address", "latitude", "longitude", "place_id", "category"]
+FEATURES_START = re.compile(r'"features"\s*:\s*\[')
+SEPARATORS = re.compile(r"[\s,]*")
+GEOJSON_HEAD = b'{"type":"FeatureCollection","features":['
+GEOJSON_TAIL = b"]}"
+# Only the first few bad rows are reported back
+MAX_REPORTED_ERRORS = 20
+
+_decoder = json.JSONDecoder()
+
+
+def feature(row) -> dict:
+    """GeoJSON Feature for an export row (see app.routers.transfer.export_stmt)."""
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [row.longitude, row.latitude]},
+        "properties": {
+            "list": row.list,
+            "name": row.name,
+            "address": row.address,
+            "place_id": row.place_id,
+            "category": row.category,
+        },
+    }
+
+
+def features_chunk(rows) -> bytes:
+    """Comma-separated Features for a partition of rows, to go between GEOJSON_HEAD and GEOJSON_TAIL."""
+    # Serialize the partition as one array and strip its brackets
+    return dumps([feature(row) for row in rows])[1:-1]
+
+
+def csv_chunk(rows, header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(CSV_FIELDS)
+    writer.writerows([getattr(row, field) for field in CSV_FIELDS] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def iter_csv_records(file):
+    """Dicts per CSV row, read lazily from a binary file."""
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        yield from csv.DictReader(text)
+    finally:
+        # Leave the underlying upload open for its owner to close
+        text.detach()
+
+
+def iter_geojson_records(file, chunk_size: int = 64 * 1024):
+    """Dicts per Feature of a FeatureCollection, decoded one at a time from a binary file.
+
+    Only the current feature and one chunk are held in memory, whatever the file size.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+
+    def fill() -> bool:
+        nonlocal buffer
+        chunk = file.read(chunk_size)
+        buffer += decoder.decode(chunk, final=not chunk)
+        return bool(chunk)
+
+    while (match := FEATURES_START.search(buffer)) is None:
+        if not fill():
+            raise ValueError("no FeatureCollection features array found")
+    buffer = buffer[match.end():]
+
+    while True:
+        pos = SEPARATORS.match(buffer).end()
+        if pos == len(buffer):
+            if not fill():
+                raise ValueError("unterminated features array")
+            continue
+        if buffer[pos] == "]":
+            return
+        try:
+            item, end = _decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Most likely the feature continues in the next chunk
+            if not fill():
+                raise ValueError("malformed feature")
+            continue
+        buffer = buffer[end:]
+        yield _feature_record(item)
+
+
+def _feature_record(item) -> dict:
+    if not isinstance(item, dict):
+        return {}
+    coordinates = (item.get("geometry") or {}).get("coordinates") or []
+    return {
+        **(item.get("properties") or {}),
+        "longitude": coordinates[0] if len(coordinates) > 1 else None,
+        "latitude": coordinates[1] if len(coordinates) > 1 else None,
+    }
+
+
+RECORD_READERS = {"csv": iter_csv_records, "geojson": iter_geojson_records}
+
+
+def import_batches(file, fmt: str, size: int, report: dict):
+    """Batches of (list name, LocationCreate) parsed from an uploaded file.
+
+    Rows that don't validate are skipped and counted in report["invalid"]; the first
+    few are described in report["errors"].
+    """
+    batch = []
+    for number, record in enumerate(RECORD_READERS[fmt](file), start=1):
+        try:
+            location = LocationCreate.model_validate({
+                # locations.category is NOT NULL, and an uncategorized place exports as ""
+                "category": "",
+                **{
+                    field: value for field, value in record.items()
+                    if field in LocationCreate.model_fields and value not in (None, "")
+                },
+            })
+        except ValidationError as exc:
+            report["invalid"] += 1
+            if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                error = exc.errors()[0]
+                report["errors"].append(f"row {number}: {'.'.join(map(str, error['loc']))}: {error['msg']}")
+            continue
+        batch.append((str(record.get("list") or "").strip(), location))
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
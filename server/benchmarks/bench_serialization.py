@@ -0,0 +1,86 @@
+"""Per-request CPU spent turning route return values into JSON.
+
+Compares the old untyped path (dict -> jsonable_encoder -> json.dumps) with typed
+response models (Pydantic straight to bytes) and with returning FastJSONResponse
+directly, for a 50-result search and a 5k-location list.
+
+    python -m benchmarks.bench_serialization [--requests 200]
+"""
+import argparse
+import asyncio
+import time
+import httpx
+from fastapi import FastAPI
+from app.core.responses import FastJSONResponse
+from app.schemas.list import ListDetail
+from app.schemas.location import SearchResponse
+
+
+def search_payload(n: int = 50) -> dict:
+    return {"results": [{
+        "name": f"Cafe {i}",
+        "address": f"{i} Main Street, Springfield, IL 62701, United States of America",
+        "latitude": 39.78 + i / 1e4,
+        "longitude": -89.65,
+        "place_id": f"51{i:064d}",
+        "category": "catering.cafe",
+        "score": 0.9 - i / 100,
+    } for i in range(n)]}
+
+
+def list_payload(n: int = 5000) -> dict:
+    return {"id": 1, "name": "Favorites", "is_default": True, "next_cursor": None, "locations": [{
+        "id": i,
+        "name": f"Place {i}",
+        "address": f"{i} Main Street, Springfield",
+        "latitude": 37.1 + i / 1e4,
+        "longitude": -122.3,
+        "place_id": f"51{i:064d}",
+        "category": "catering.restaurant",
+    } for i in range(n)]}
+
+
+def build_app(payload: dict, model) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/untyped")
+    async def untyped():
+        return payload
+
+    @app.get("/typed", response_model=model)
+    async def typed():
+        return payload
+
+    @app.get("/orjson")
+    async def fast():
+        return FastJSONResponse(payload)
+
+    return app
+
+
+async def cpu_per_request(app: FastAPI, path: str, requests: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get(path)
+        start = time.process_time()
+        for _ in range(requests):
+            await client.get(path)
+        return (time.process_time() - start) / requests * 1000
+
+
+async def main(requests: int):
+    for label, payload, model in [
+        ("search, 50 results", search_payload(), SearchResponse),
+        ("list, 5000 locations", list_payload(), ListDetail),
+    ]:
+        app = build_app(payload, model)
+        print(label)
+        for path in ("/untyped", "/typed", "/orjson"):
+            ms = await cpu_per_request(app, path, requests if "search" in label else max(requests // 10, 5))
+            print(f"  {path:<9} {ms:8.3f} ms CPU/request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    asyncio.run(main(parser.parse_args().requests))
@@ -0,0 +1,81 @@
+"""Concurrent add_location-style writes against SQLite, default vs tuned pragmas.
+
+Each writer thread inserts a Location and a ListLocation with a commit after each,
+which is what add_location does per saved place.
+
+    python -m benchmarks.bench_sqlite_pragmas [--threads 8] [--writes 200]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base, create_db_engine
+from app.models import User, List, Location, ListLocation
+
+
+def default_engine(url: str):
+    # What app/database.py did before: default journal mode, no busy_timeout
+    return create_engine(url, connect_args={"check_same_thread": False})
+
+
+def run(make_engine, threads: int, writes: int) -> tuple[float, int]:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = make_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    with Session() as db:
+        user = User(username="bench", hashed_password="x")
+        db.add(user)
+        db.flush()
+        lst = List(name="bench", user_id=user.id)
+        db.add(lst)
+        db.commit()
+        list_id = lst.id
+
+    errors = 0
+    lock = threading.Lock()
+
+    def writer(n: int):
+        nonlocal errors
+        db = Session()
+        for i in range(writes):
+            try:
+                loc = Location(name="p", address="a", latitude=0, longitude=0, place_id=f"{n}-{i}", category="c")
+                db.add(loc)
+                db.commit()
+                db.add(ListLocation(list_id=list_id, location_id=loc.id))
+                db.commit()
+            except Exception:
+                db.rollback()
+                with lock:
+                    errors += 1
+        db.close()
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=writer, args=(n,)) for n in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    return threads * writes / elapsed, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=200)
+    args = parser.parse_args()
+
+    for label, make_engine in [("default", default_engine), ("tuned", create_db_engine)]:
+        rate, errors = run(make_engine, args.threads, args.writes)
+        print(f"{label:>8}: {rate:8.0f} places/s  ({errors} failed writes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Local stand-in for the Geoapify geocoding API, so load tests don't hit the real one.
+
+Replays recorded /v1/geocode/search responses after a configurable delay. Queries
+with no recording get a synthetic response of the same shape, centred on the bias
+point, so any query mix works out of the box. /v1/geocode/autocomplete and
+/v2/place-details are always synthetic.
+
+    python -m benchmarks.geoapify_stub serve [--port 8081] [--latency-ms 150] [--jitter-ms 50]
+    python -m benchmarks.geoapify_stub record --text cafe --text pizza --lat 37.77 --long -122.42
+
+`record` calls the real API with API_KEY and appends to the recordings file. No
+recordings ship with the repo, so until `record` has been run every response is
+synthetic. Run the app against the stub with GEOAPIFY_BASE_URL=http://127.0.0.1:8081.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import httpx
+import uvicorn
+from fastapi import FastAPI, Query, Response
+from app.core.config import API_KEY
+
+RECORDINGS = os.path.join(os.path.dirname(__file__), "recordings", "geocode_search.jsonl")
+CATEGORIES = ["catering.cafe", "catering.restaurant", "commercial.supermarket", "leisure.park", "tourism.sights"]
+
+
+def recording_key(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def load_recordings(path: str) -> dict[str, dict]:
+    recordings = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    recordings[recording_key(entry["text"])] = entry["response"]
+    return recordings
+
+
+def parse_bias(bias: str | None) -> tuple[float, float]:
+    # "proximity:lon,lat|circle:lon,lat,radius"
+    try:
+        lon, lat = bias.split("|")[0].split(":", 1)[1].split(",")[:2]
+        return float(lat), float(lon)
+    except (AttributeError, IndexError, ValueError):
+        return 0.0, 0.0
+
+
+def synthetic_response(text: str, lat: float, lon: float, limit: int) -> dict:
+    rng = random.Random(f"{recording_key(text)}|{lat:.2f}|{lon:.2f}")
+    results = []
+    for i in range(limit):
+        plat = lat + rng.uniform(-0.04, 0.04)
+        plon = lon + rng.uniform(-0.04, 0.04)
+        results.append({
+            "name": f"{text.title()} {i + 1}",
+            "address_line1": f"{text.title()} {i + 1}",
+            "formatted": f"{rng.randint(1, 2000)} Market Street, San Francisco, CA 94103, United States of America",
+            "lat": plat,
+            "lon": plon,
+            "place_id": f"stub{rng.getrandbits(128):032x}",
+            "category": rng.choice(CATEGORIES),
+            "result_type": "amenity",
+            "rank": {"confidence": round(rng.uniform(0.5, 1.0), 3), "match_type": "full_match"},
+            "distance": int(abs(plat - lat) * 111_000 + abs(plon - lon) * 88_000),
+        })
+    return {"results": results, "query": {"text": text}}
+
+
+def create_app(recordings: dict[str, dict], latency_ms: float, jitter_ms: float) -> FastAPI:
+    stub = FastAPI()
+    stub.state.requests = 0
+
+    async def delay():
+        stub.state.requests += 1
+        await asyncio.sleep(max(latency_ms + random.uniform(-jitter_ms, jitter_ms), 0) / 1000)
+
+    @stub.get("/v1/geocode/search")
+    async def geocode_search(
+        text: str,
+        bias: str | None = None,
+        limit: int = Query(20, ge=1, le=100),
+    ):
+        await delay()
+        data = recordings.get(recording_key(text))
+        if data is None:
+            data = synthetic_response(text, *parse_bias(bias), limit)
+        return Response(json.dumps(data), media_type="application/json")
+
+    @stub.get("/v1/geocode/autocomplete")
+    async def geocode_autocomplete(
+        text: str,
+        bias: str | None = None,
+        limit: int = Query(5, ge=1, le=20),
+    ):
+        await delay()
+        return Response(json.dumps(synthetic_response(text, *parse_bias(bias), limit)), media_type="application/json")
+
+    @stub.get("/v2/place-details")
+    async def place_details(id: str):
+        await delay()
+        rng = random.Random(id)
+        return {"type": "FeatureCollection", "features": [{"type": "Feature", "properties": {
+            "feature_type": "details",
+            "place_id": id,
+            "opening_hours": rng.choice(["Mo-Fr 08:00-18:00", "Mo-Su 07:00-22:00", "24/7"]),
+            "website": f"https://{id[:12]}.example.com",
+            "contact": {"phone": f"+1 415 555 {rng.randint(0, 9999):04d}"},
+            "categories": [rng.choice(CATEGORIES)],
+        }}]}
+
+    @stub.get("/stats")
+    async def stats():
+        return {"requests": stub.state.requests, "recordings": len(recordings)}
+
+    return stub
+
+
+async def record(texts: list[str], lat: float, lon: float, limit: int, path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    async with httpx.AsyncClient(timeout=10) as client:
+        with open(path, "a") as f:
+            for text in texts:
+                response = await client.get("https://api.geoapify.com/v1/geocode/search", params={
+                    "text": text,
+                    "bias": f"proximity:{lon},{lat}|circle:{lon},{lat},5000",
+                    "format": "json",
+                    "limit": limit,
+                    "apiKey": API_KEY,
+                })
+                response.raise_for_status()
+                f.write(json.dumps({"text": text, "response": response.json()}) + "\n")
+                print(f"recorded {text!r}: {len(response.json().get('results', []))} results")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8081)
+    serve.add_argument("--latency-ms", type=float, default=150)
+    serve.add_argument("--jitter-ms", type=float, default=50)
+    serve.add_argument("--recordings", default=RECORDINGS)
+
+    rec = commands.add_parser("record")
+    rec.add_argument("--text", action="append", required=True)
+    rec.add_argument("--lat", type=float, required=True)
+    rec.add_argument("--long", type=float, required=True)
+    rec.add_argument("--limit", type=int, default=50)
+    rec.add_argument("--recordings", default=RECORDINGS)
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        recordings = load_recordings(args.recordings)
+        print(f"{len(recordings)} recorded queries, {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms latency")
+        if not recordings:
+            print(f"no recordings at {args.recordings}; every response is synthetic (see `record`)")
+        uvicorn.run(create_app(recordings, args.latency_ms, args.jitter_ms), host=args.host, port=args.port, log_level="warning")
+    else:
+        asyncio.run(record(args.text, args.lat, args.long, args.limit, args.recordings))
+
+
+if __name__ == "__main__":
+    main()
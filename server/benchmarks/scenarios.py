@@ -0,0 +1,207 @@
+"""HTTP load scenarios against a running server seeded by benchmarks.seed.
+
+    uvicorn app.main:app --workers 4                      # with GEOAPIFY_BASE_URL pointing at the stub
+    python -m benchmarks.scenarios [--base-url http://127.0.0.1:8000] [--scenario all]
+                                   [--requests 500] [--concurrency 50] [--users 10000]
+
+Scenarios:
+    login-storm   POST /auth/login for random bench users (bcrypt bound)
+    search-burst  GET /searchQuery for a handful of queries around the seed cities,
+                  mixing repeats (cache hits) with fresh cells (upstream calls)
+    big-list      GET /lists/{id} of bench0's big list, cold and with If-None-Match
+    bulk-save     POST /locations/{list_id}/bulk of 50 new places per request
+
+Prints p50/p95/p99 latency and requests/s per endpoint, plus non-2xx counts.
+"""
+import argparse
+import asyncio
+import math
+import random
+import time
+import httpx
+from benchmarks.seed import BENCH_PASSWORD, BIG_LIST_NAME, CITIES
+
+SEARCH_TERMS = ["cafe", "pizza", "museum", "park", "bakery", "sushi", "pharmacy", "bookstore"]
+BULK_BATCH = 50
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.failures: dict[str, int] = {}
+        self.elapsed = 0.0
+
+    def add(self, label: str, seconds: float, status: int):
+        self.latencies.setdefault(label, []).append(seconds)
+        if not 200 <= status < 400:
+            self.failures[label] = self.failures.get(label, 0) + 1
+
+    def report(self, scenario: str):
+        print(f"\n{scenario} ({self.elapsed:.1f}s)")
+        print(f"  {'endpoint':<32} {'n':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'errors':>7}")
+        for label, samples in self.latencies.items():
+            samples.sort()
+            p50, p95, p99 = (percentile(samples, p) * 1000 for p in (50, 95, 99))
+            rate = len(samples) / self.elapsed if self.elapsed else 0
+            print(
+                f"  {label:<32} {len(samples):>6} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {rate:>8.1f} "
+                f"{self.failures.get(label, 0):>7}"
+            )
+
+
+def percentile(sorted_samples: list[float], p: float) -> float:
+    # Nearest-rank
+    index = max(math.ceil(p / 100 * len(sorted_samples)) - 1, 0)
+    return sorted_samples[index]
+
+
+async def timed(recorder: Recorder, label: str, request) -> httpx.Response:
+    start = time.perf_counter()
+    response = await request
+    recorder.add(label, time.perf_counter() - start, response.status_code)
+    return response
+
+
+async def run_requests(requests: int, concurrency: int, make_request) -> float:
+    """Call `make_request(i)` for i in range(requests), at most `concurrency` at a time."""
+    queue = iter(range(requests))
+
+    async def worker():
+        for i in queue:
+            await make_request(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return time.perf_counter() - start
+
+
+async def login(client: httpx.AsyncClient, username: str) -> httpx.Response:
+    response = await client.post("/auth/login", json={"username": username, "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    return response
+
+
+async def login_storm(base_url: str, args) -> Recorder:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def one(i):
+            username = f"bench{random.randrange(args.users)}"
+            await timed(recorder, "POST /auth/login", client.post(
+                "/auth/login", json={"username": username, "password": BENCH_PASSWORD}
+            ))
+
+        recorder.elapsed = await run_requests(args.requests, args.concurrency, one)
+    return recorder
+
+
+async def search_burst(base_url: str, args) -> Recorder:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def one(i):
+            lat, lon = random.choice(CITIES)
+            # Half the requests land in a few hot cells, half spread over ~100 km
+            spread = 0.001 if i % 2 else 0.5
+            params = {
+                "query": random.choice(SEARCH_TERMS),
+                "lat": f"{lat + random.uniform(-spread, spread):.5f}",
+                "long": f"{lon + random.uniform(-spread, spread):.5f}",
+            }
+            await timed(recorder, "GET /searchQuery", client.get("/searchQuery", params=params))
+
+        recorder.elapsed = await run_requests(args.requests, args.concurrency, one)
+    return recorder
+
+
+async def big_list(base_url: str, args) -> Recorder:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        await login(client, "bench0")
+        lists = (await client.get("/lists")).json()
+        list_id = next(item["id"] for item in lists if item["name"] == BIG_LIST_NAME)
+        etag = (await client.get(f"/lists/{list_id}")).headers.get("etag")
+
+        async def one(i):
+            if i % 2 and etag:
+                await timed(recorder, "GET /lists/{id} (If-None-Match)", client.get(
+                    f"/lists/{list_id}", headers={"If-None-Match": etag}
+                ))
+            else:
+                await timed(recorder, "GET /lists/{id}", client.get(f"/lists/{list_id}"))
+
+        recorder.elapsed = await run_requests(args.requests, args.concurrency, one)
+    return recorder
+
+
+async def bulk_save(base_url: str, args) -> Recorder:
+    recorder = Recorder()
+    # One client (cookie jar) per concurrent worker, each logged in as a different user
+    clients = [httpx.AsyncClient(base_url=base_url, timeout=60) for _ in range(args.concurrency)]
+    try:
+        list_ids = []
+        for n, client in enumerate(clients):
+            await login(client, f"bench{n % args.users}")
+            lists = (await client.get("/lists")).json()
+            list_ids.append(next(item["id"] for item in lists if item["name"] == "Favorites"))
+
+        run_id = int(time.time())
+
+        async def one(i, slot):
+            lat, lon = random.choice(CITIES)
+            places = [{
+                "name": f"Bulk place {run_id}-{i}-{j}",
+                "address": "1 Bench Street",
+                "latitude": lat + random.gauss(0, 0.05),
+                "longitude": lon + random.gauss(0, 0.05),
+                "place_id": f"bulk-{run_id}-{i}-{j}",
+                "category": "catering.cafe",
+            } for j in range(BULK_BATCH)]
+            await timed(recorder, "POST /locations/{id}/bulk", clients[slot].post(
+                f"/locations/{list_ids[slot]}/bulk", json=places
+            ))
+
+        # Each worker owns one client so a user's saves never overlap
+        queue = iter(range(args.requests))
+
+        async def worker(slot):
+            for i in queue:
+                await one(i, slot)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker(slot) for slot in range(args.concurrency)])
+        recorder.elapsed = time.perf_counter() - start
+    finally:
+        await asyncio.gather(*[client.aclose() for client in clients])
+    return recorder
+
+
+SCENARIOS = {
+    "login-storm": login_storm,
+    "search-burst": search_burst,
+    "big-list": big_list,
+    "bulk-save": bulk_save,
+}
+
+
+async def main_async(args):
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    for name in names:
+        recorder = await SCENARIOS[name](args.base_url, args)
+        recorder.report(name)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenario", choices=["all", *SCENARIOS], default="all")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=10_000, help="number of seeded bench users")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
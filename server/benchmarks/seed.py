@@ -0,0 +1,118 @@
+"""Fill the configured database (DATABASE_URL) with load-test data.
+
+Creates `--users` users named bench0..benchN-1, all with password BENCH_PASSWORD and
+the usual Favorites/Planned lists, and `--locations` places clustered around a few
+cities, each saved to one user's list. bench0 also gets a "Big" list holding
+`--big-list` places for the big-list-fetch scenario.
+
+    python -m benchmarks.seed [--users 10000] [--locations 1000000] [--big-list 20000]
+
+Rows go in with executemany batches rather than the ORM, and every user shares one
+bcrypt hash (at BCRYPT_ROUNDS), so a full seed takes minutes rather than hours.
+"""
+import argparse
+import random
+import time
+from sqlalchemy import func, insert, select
+from app.core.security import hash_password
+from app.database import engine
+from app.models import User, List, Location, ListLocation, create_schema
+
+BENCH_PASSWORD = "bench-password"
+BIG_LIST_NAME = "Big"
+BATCH_SIZE = 10_000
+
+# (lat, lon) of the cities places are scattered around
+CITIES = [
+    (37.7749, -122.4194),
+    (40.7128, -74.0060),
+    (51.5074, -0.1278),
+    (48.8566, 2.3522),
+    (35.6762, 139.6503),
+    (-33.8688, 151.2093),
+]
+CATEGORIES = ["catering.cafe", "catering.restaurant", "commercial.supermarket", "leisure.park", "tourism.sights"]
+
+
+def next_id(conn, model) -> int:
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def insert_batches(conn, model, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            conn.execute(insert(model), batch)
+            batch = []
+    if batch:
+        conn.execute(insert(model), batch)
+
+
+def place(rng: random.Random, location_id: int) -> dict:
+    lat, lon = rng.choice(CITIES)
+    return {
+        "id": location_id,
+        "name": f"Bench place {location_id}",
+        "address": f"{rng.randint(1, 9999)} Bench Street",
+        "latitude": lat + rng.gauss(0, 0.05),
+        "longitude": lon + rng.gauss(0, 0.05),
+        "place_id": f"bench-{location_id}",
+        "category": rng.choice(CATEGORIES),
+    }
+
+
+def seed(users: int, locations: int, big_list: int, seed_value: int = 0):
+    create_schema(engine)
+    rng = random.Random(seed_value)
+    hashed = hash_password(BENCH_PASSWORD)
+
+    with engine.begin() as conn:
+        if conn.execute(select(User.id).where(User.username == "bench0")).first():
+            raise SystemExit("benchmark users already exist; seed a fresh DATABASE_URL")
+
+        first_user = next_id(conn, User)
+        first_list = next_id(conn, List)
+        first_location = next_id(conn, Location)
+
+        insert_batches(conn, User, (
+            {"id": first_user + i, "username": f"bench{i}", "hashed_password": hashed} for i in range(users)
+        ))
+        # Lists 2i and 2i+1 (relative to first_list) are user i's Favorites and Planned
+        insert_batches(conn, List, (
+            {"id": first_list + 2 * i + j, "user_id": first_user + i, "name": name, "is_default": True}
+            for i in range(users) for j, name in enumerate(("Favorites", "Planned"))
+        ))
+        big_list_id = first_list + 2 * users
+        conn.execute(insert(List), [{"id": big_list_id, "user_id": first_user, "name": BIG_LIST_NAME}])
+
+        insert_batches(conn, Location, (place(rng, first_location + i) for i in range(locations)))
+        insert_batches(conn, ListLocation, (
+            {"list_id": first_list + rng.randrange(2 * users), "location_id": first_location + i}
+            for i in range(locations)
+        ))
+        insert_batches(conn, ListLocation, (
+            {"list_id": big_list_id, "location_id": first_location + i}
+            for i in rng.sample(range(locations), min(big_list, locations))
+        ))
+    return big_list_id
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--locations", type=int, default=1_000_000)
+    parser.add_argument("--big-list", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    big_list_id = seed(args.users, args.locations, args.big_list, args.seed)
+    print(
+        f"seeded {args.users} users and {args.locations} locations in {time.perf_counter() - start:.1f}s "
+        f"(bench0's big list is {big_list_id})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,37 @@
+import asyncio
+import os
 import pytest
+
+# Cheapest bcrypt cost; must be set before app config is imported
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.main import app
-from app.database import Base
-from app.core.security import get_db
+from app.core.config import DATABASE_ASYNC
+from app.database import Base, session_dependency, create_db_engine, create_async_db_engine
+from app.core.security import get_db, principal_cache
+from app.routers.lists import list_payloads
+from app.routers.locations import cluster_cache
+from app.utils import geoapify
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base.metadata.create_all(bind=engine)
+# DATABASE_ASYNC=true runs the same suite through the async engine.
+# TestClient starts a fresh event loop per request, so don't pool async connections.
+TestingAsyncSessionLocal = (
+    async_sessionmaker(create_async_db_engine(ASYNC_DATABASE_URL, poolclass=NullPool), autoflush=False, expire_on_commit=False)
+    if DATABASE_ASYNC else None
+)
 
-def override_get_db():
-    db = TestingSessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+Base.metadata.create_all(bind=engine)
 
-app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_db] = session_dependency(TestingSessionLocal, TestingAsyncSessionLocal)
 
 @pytest.fixture
 def db():
@@ -33,4 +45,79 @@ def db():
 def client():
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
-    return TestClient(app)
\ No newline at end of file
+    principal_cache.clear()
+    cluster_cache.clear()
+    list_payloads.clear()
+    return TestClient(app)
+
+def login_and_get_cookies(client, username="testuser", password="testpass"):
+    client.post("/auth/register", json={"username": username, "password": password})
+    resp = client.post("/auth/login", json={"username": username, "password": password})
+    return resp.cookies
+
+def favorites_id(client, cookies):
+    lists = client.get("/lists", cookies=cookies).json()
+    return next(l for l in lists if l["name"] == "Favorites")["id"]
+
+def place_payload(place_id, **fields):
+    """Body for the add-location endpoints; `fields` override the defaults."""
+    return {
+        "name": f"Place {place_id}",
+        "address": "1 Main St",
+        "latitude": 37.0,
+        "longitude": -122.0,
+        "place_id": place_id,
+        "category": "catering.cafe",
+        **fields,
+    }
+
+def add_place(client, cookies, list_id, place_id, **fields):
+    return client.post(f"/locations/{list_id}", json=place_payload(place_id, **fields), cookies=cookies)
+
+def add_places(client, cookies, list_id, count, **fields):
+    """Bulk-adds place0..place{count-1}, each 0.01 degrees further north; `fields` apply to all."""
+    return client.post(f"/locations/{list_id}/bulk", json=[
+        place_payload(f"place{i}", **{"name": f"Place {i}", "latitude": 37.0 + i / 100, **fields})
+        for i in range(count)
+    ], cookies=cookies)
+
+class FakeResponse:
+    status_code = 200
+
+    def json(self):
+        return {"results": [{
+            "name": "Test Cafe",
+            "formatted": "1 Main St",
+            "lat": 40.0,
+            "lon": -74.0,
+            "place_id": "cafe1",
+            "category": "catering.cafe",
+            "rank": {"confidence": 1},
+            "distance": 100,
+        }]}
+
+class FakeClient:
+    """Stands in for the Geoapify client, recording the params of each call."""
+
+    def __init__(self, calls, delay=0):
+        self.calls = calls
+        self.delay = delay
+
+    async def get(self, url, params=None, **kwargs):
+        self.calls.append(params)
+        await asyncio.sleep(self.delay)
+        return FakeResponse()
+
+def clear_search_caches():
+    geoapify.search_cache.clear()
+    geoapify.search_payloads.clear()
+    geoapify.autocomplete_cache.clear()
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Geoapify calls made during the test, answered by FakeClient."""
+    calls = []
+    monkeypatch.setattr(geoapify, "get_client", lambda: FakeClient(calls, delay=0.01))
+    clear_search_caches()
+    yield calls
+    clear_search_caches()
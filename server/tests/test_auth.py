@@ -1,4 +1,8 @@
 import pytest
+from passlib.context import CryptContext
+from app.core import security
+from app.core.config import BCRYPT_ROUNDS
+from app.core.security import principal_cache
 from app.models import User, List
 
 def test_register(client):
@@ -76,4 +80,60 @@ def test_logout_clears_cookies(client):
     assert response.json()["message"] == "Logged out"
     # Check cookies cleared (set to empty string)
     assert "access_token" not in response.cookies
-    assert "refresh_token" not in response.cookies
\ No newline at end of file
+    assert "refresh_token" not in response.cookies
+
+
+def test_me_served_from_principal_cache(client, db):
+    client.post("/auth/register", json={"username": "testuser", "password": "testpass"})
+    cookies = client.post("/auth/login", json={"username": "testuser", "password": "testpass"}).cookies
+
+    client.get("/auth/me", cookies=cookies)
+    hits = principal_cache.hits
+    response = client.get("/auth/me", cookies=cookies)
+
+    assert response.status_code == 200
+    assert principal_cache.hits == hits + 1
+
+
+def test_deleting_user_invalidates_principal(client, db):
+    client.post("/auth/register", json={"username": "testuser", "password": "testpass"})
+    cookies = client.post("/auth/login", json={"username": "testuser", "password": "testpass"}).cookies
+    assert client.get("/auth/me", cookies=cookies).status_code == 200
+
+    db.delete(db.query(User).filter(User.username == "testuser").first())
+    db.commit()
+
+    response = client.get("/auth/me", cookies=cookies)
+    assert response.status_code == 404
+
+
+def test_logout_invalidates_principal(client):
+    client.post("/auth/register", json={"username": "testuser", "password": "testpass"})
+    cookies = client.post("/auth/login", json={"username": "testuser", "password": "testpass"}).cookies
+    client.get("/auth/me", cookies=cookies)
+    assert len(principal_cache) == 1
+
+    client.post("/auth/logout", cookies=cookies)
+    assert len(principal_cache) == 0
+
+
+def test_login_rehashes_outdated_cost(client, db):
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=BCRYPT_ROUNDS + 1).hash("testpass")
+    db.add(User(username="olduser", hashed_password=old_hash))
+    db.commit()
+
+    response = client.post("/auth/login", json={"username": "olduser", "password": "testpass"})
+    assert response.status_code == 200
+
+    db.expire_all()
+    new_hash = db.query(User).filter(User.username == "olduser").first().hashed_password
+    assert new_hash != old_hash
+    assert new_hash.split("$")[2] == f"{BCRYPT_ROUNDS:02d}"
+
+
+def test_login_rejected_when_hash_queue_full(client, monkeypatch):
+    client.post("/auth/register", json={"username": "testuser", "password": "testpass"})
+    monkeypatch.setattr(security, "_password_pending", security.PASSWORD_HASH_MAX_PENDING)
+    response = client.post("/auth/login", json={"username": "testuser", "password": "testpass"})
+
+    assert response.status_code == 503
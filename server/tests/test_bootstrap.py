@@ -0,0 +1,79 @@
+from app.core import metrics
+from tests.conftest import add_place, login_and_get_cookies
+
+def list_ids(client, cookies):
+    return {l["name"]: l["id"] for l in client.get("/lists", cookies=cookies).json()}
+
+def queries_for(client, cookies, **params):
+    before = metrics.request_queries.sum("GET", "/bootstrap")
+    response = client.get("/bootstrap", params=params, cookies=cookies)
+    assert response.status_code == 200
+    return metrics.request_queries.sum("GET", "/bootstrap") - before
+
+def test_bootstrap_counts_and_place_ids(client):
+    cookies = login_and_get_cookies(client)
+    lists = list_ids(client, cookies)
+    add_place(client, cookies, lists["Favorites"], "b")
+    add_place(client, cookies, lists["Favorites"], "a")
+    add_place(client, cookies, lists["Planned"], "a")
+
+    data = client.get("/bootstrap", cookies=cookies).json()
+    assert data["user"]["username"] == "testuser"
+    assert [(l["name"], l["count"]) for l in data["lists"]] == [("Favorites", 2), ("Planned", 1)]
+    assert all("locations" not in l for l in data["lists"])
+    assert data["place_ids"] == ["a", "b"]
+
+def test_bootstrap_with_locations(client):
+    cookies = login_and_get_cookies(client)
+    lists = list_ids(client, cookies)
+    add_place(client, cookies, lists["Favorites"], "b")
+    add_place(client, cookies, lists["Favorites"], "a")
+
+    data = client.get("/bootstrap", params={"locations": "true"}, cookies=cookies).json()
+    favorites = next(l for l in data["lists"] if l["name"] == "Favorites")
+    assert [loc["place_id"] for loc in favorites["locations"]] == ["b", "a"]
+    assert next(l for l in data["lists"] if l["name"] == "Planned")["locations"] == []
+    assert data["place_ids"] is None
+
+def test_bootstrap_queries_do_not_grow_with_lists(client):
+    cookies = login_and_get_cookies(client)
+    client.get("/bootstrap", cookies=cookies)
+    few = queries_for(client, cookies), queries_for(client, cookies, locations="true")
+
+    for i in range(5):
+        list_id = client.post("/lists", json={"name": f"List {i}"}, cookies=cookies).json()["id"]
+        add_place(client, cookies, list_id, f"p{i}")
+        add_place(client, cookies, list_id, f"q{i}")
+    many = queries_for(client, cookies), queries_for(client, cookies, locations="true")
+
+    assert few == many == (3, 3)
+
+def test_bootstrap_etag(client):
+    cookies = login_and_get_cookies(client)
+    lists = list_ids(client, cookies)
+    etag = client.get("/bootstrap", cookies=cookies).headers["etag"]
+
+    cached = client.get("/bootstrap", headers={"If-None-Match": etag}, cookies=cookies)
+    assert cached.status_code == 304
+    # The locations variant is a different representation
+    assert client.get("/bootstrap", params={"locations": "true"}, headers={"If-None-Match": etag}, cookies=cookies).status_code == 200
+
+    add_place(client, cookies, lists["Favorites"], "a")
+    changed = client.get("/bootstrap", headers={"If-None-Match": etag}, cookies=cookies)
+    assert changed.status_code == 200
+    assert changed.json()["place_ids"] == ["a"]
+    etag = changed.headers["etag"]
+
+    client.post("/lists", json={"name": "Trip"}, cookies=cookies)
+    assert client.get("/bootstrap", headers={"If-None-Match": etag}, cookies=cookies).status_code == 200
+
+def test_bootstrap_only_shows_own_lists(client):
+    cookies = login_and_get_cookies(client)
+    add_place(client, cookies, list_ids(client, cookies)["Favorites"], "a")
+    other = login_and_get_cookies(client, "other", "otherpass")
+
+    data = client.get("/bootstrap", cookies=other).json()
+    assert data["user"]["username"] == "other"
+    assert data["place_ids"] == []
+    client.cookies.clear()
+    assert client.get("/bootstrap").status_code == 401
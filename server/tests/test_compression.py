@@ -0,0 +1,114 @@
+import gzip
+import pytest
+from sqlalchemy import event
+from app.core import compression
+from app.core.compression import negotiate
+from tests.conftest import add_places, engine, favorites_id, login_and_get_cookies
+
+# Long enough that a page of them is worth compressing
+LONG_ADDRESS = "Some Long Street Name, Some City, Some Region 00000, Some Country"
+
+def test_negotiate():
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("") is None
+    assert negotiate("identity") is None
+    assert negotiate("gzip;q=0") is None
+    assert negotiate("*") == compression.ENCODINGS[0]
+    assert negotiate("*, gzip;q=0") == ("br" if compression.brotli is not None else None)
+    assert negotiate("br;q=0.5, gzip;q=1") == "gzip"
+
+def test_large_list_is_gzipped_with_weak_etag(client):
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+    add_places(client, cookies, fav, 30, address=LONG_ADDRESS)
+
+    response = client.get(f"/lists/{fav}", headers={"Accept-Encoding": "gzip"}, cookies=cookies)
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert len(response.json()["locations"]) == 30
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+
+    cached = client.get(f"/lists/{fav}", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}, cookies=cookies)
+    assert cached.status_code == 304
+
+    plain = client.get(f"/lists/{fav}", headers={"Accept-Encoding": "identity"}, cookies=cookies)
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == response.json()
+
+def test_small_responses_are_not_compressed(client):
+    cookies = login_and_get_cookies(client)
+    response = client.get("/lists", headers={"Accept-Encoding": "gzip"}, cookies=cookies)
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+
+def test_cached_list_payload_skips_queries(client):
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+    add_places(client, cookies, fav, 30, address=LONG_ADDRESS)
+    first = client.get(f"/lists/{fav}", headers={"Accept-Encoding": "gzip"}, cookies=cookies)
+
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        second = client.get(f"/lists/{fav}", headers={"Accept-Encoding": "gzip"}, cookies=cookies)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert second.json() == first.json()
+    assert not any("list_locations" in s for s in statements)
+
+def test_deleted_list_payload_is_not_reused(client):
+    cookies = login_and_get_cookies(client)
+    list_id = client.post("/lists", json={"name": "Trip"}, cookies=cookies).json()["id"]
+    add_places(client, cookies, list_id, 30, address=LONG_ADDRESS)
+    client.get(f"/lists/{list_id}", cookies=cookies)
+    client.delete(f"/lists/{list_id}", cookies=cookies)
+
+    new_id = client.post("/lists", json={"name": "Other trip"}, cookies=cookies).json()["id"]
+    response = client.get(f"/lists/{new_id}", cookies=cookies).json()
+    assert response["name"] == "Other trip"
+    assert response["locations"] == []
+
+def test_search_payload_compressed_once(client, upstream, monkeypatch):
+    compressed = []
+    real_compress = compression.compress
+    monkeypatch.setattr(compression, "compress", lambda body, enc: compressed.append(enc) or real_compress(body, enc))
+    monkeypatch.setattr(compression, "COMPRESSION_MIN_SIZE", 10)
+
+    params = {"query": "cafe", "lat": "40.0", "long": "-74.0"}
+    for _ in range(3):
+        response = client.get("/searchQuery", params=params, headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json()["results"][0]["place_id"] == "cafe1"
+
+    assert len(upstream) == 1
+    assert compressed == ["gzip"]
+
+def test_streamed_export_is_compressed(client):
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+    add_places(client, cookies, fav, 30, address=LONG_ADDRESS)
+
+    response = client.get("/lists/export?format=csv", headers={"Accept-Encoding": "gzip"}, cookies=cookies)
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text.count("\n") == 31
+
+def test_brotli(client):
+    pytest.importorskip("brotli")
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+    add_places(client, cookies, fav, 30, address=LONG_ADDRESS)
+
+    response = client.get(f"/lists/{fav}", headers={"Accept-Encoding": "br, gzip"}, cookies=cookies)
+    assert response.headers["content-encoding"] == "br"
+    assert len(response.json()["locations"]) == 30
+
+def test_gzip_payload_is_deterministic():
+    payload = b'{"results": []}' * 100
+    assert compression.compress(payload, "gzip") == compression.compress(payload, "gzip")
+    assert gzip.decompress(compression.compress(payload, "gzip")) == payload
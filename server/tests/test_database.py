@@ -0,0 +1,150 @@
+import os
+import subprocess
+import sys
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, inspect, select
+from app import main
+from app.core.config import DB_POOL_SIZE, DB_STATEMENT_TIMEOUT, SQLITE_CACHE_SIZE
+from app.database import async_url_for, create_db_engine, engine_options
+from app.models import MIGRATIONS, Base, List, ListLocation, Location, SchemaMigration
+from app.routers.lists import fts_query, fts_search_stmt, list_locations_stmt
+from tests.conftest import engine
+
+def test_sqlite_pragmas_applied():
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        # NORMAL
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == DB_STATEMENT_TIMEOUT
+        assert conn.exec_driver_sql("PRAGMA cache_size").scalar() == SQLITE_CACHE_SIZE
+
+def test_async_url_for():
+    assert async_url_for("sqlite:///./database.db") == "sqlite+aiosqlite:///./database.db"
+    assert async_url_for("postgresql://user:pw@host/db") == "postgresql+asyncpg://user:pw@host/db"
+
+def test_engine_options_for_memory_sqlite_share_one_connection():
+    options = engine_options("sqlite://")
+
+    assert options["poolclass"].__name__ == "StaticPool"
+    assert "pool_size" not in options
+
+def query_plan(conn, stmt) -> str:
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    return "\n".join(row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+
+def test_membership_check_uses_unique_index():
+    stmt = select(ListLocation.id).where(ListLocation.list_id == 1, ListLocation.location_id == 2)
+    with engine.connect() as conn:
+        plan = query_plan(conn, stmt)
+
+    assert "uq_list_locations_list_id_location_id" in plan
+
+def test_list_page_seeks_by_list_id():
+    with engine.connect() as conn:
+        plan = query_plan(conn, list_locations_stmt(1, cursor=10).limit(50))
+
+    assert "SCAN list_locations" not in plan
+    assert "uq_list_locations_list_id_location_id" in plan
+
+def test_lists_by_user_use_index():
+    with engine.connect() as conn:
+        plan = query_plan(conn, select(List.id).where(List.user_id == 1))
+
+    assert "ix_lists_user_id" in plan
+
+def test_memberships_by_place_avoid_table_scans():
+    stmt = (
+        select(ListLocation.list_id)
+        .join(Location, Location.id == ListLocation.location_id)
+        .where(Location.place_id.in_(["a", "b"]))
+    )
+    with engine.connect() as conn:
+        plan = query_plan(conn, stmt)
+
+    assert "SCAN" not in plan
+    assert "ix_list_locations_location_id_list_id" in plan
+
+def test_saved_place_search_starts_from_the_fts_index():
+    with engine.connect() as conn:
+        plan = query_plan(conn, fts_search_stmt(fts_query(1, "ramen sh")).limit(20))
+
+    assert "VIRTUAL TABLE" in plan.splitlines()[0]
+    assert "SCAN list_locations" not in plan
+    assert "SCAN locations" not in plan
+
+def test_migrations_upgrade_legacy_database(tmp_path):
+    legacy = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with legacy.begin() as conn:
+        # The original layout: no version columns, membership indexes or R*Tree
+        conn.exec_driver_sql("CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR, hashed_password VARCHAR NOT NULL)")
+        conn.exec_driver_sql(
+            "CREATE TABLE lists (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, name VARCHAR NOT NULL, is_default BOOLEAN NOT NULL)"
+        )
+        conn.exec_driver_sql(
+            "CREATE TABLE locations (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, address VARCHAR NOT NULL, "
+            "latitude FLOAT NOT NULL, longitude FLOAT NOT NULL, place_id VARCHAR UNIQUE, category VARCHAR NOT NULL)"
+        )
+        conn.exec_driver_sql("CREATE TABLE list_locations (id INTEGER PRIMARY KEY, list_id INTEGER NOT NULL, location_id INTEGER NOT NULL)")
+        conn.exec_driver_sql("INSERT INTO users VALUES (1, 'old', 'x')")
+        conn.exec_driver_sql("INSERT INTO lists VALUES (1, 1, 'Favorites', 1)")
+        conn.exec_driver_sql("INSERT INTO locations VALUES (1, 'p', 'a', 1.0, 2.0, 'p1', 'c')")
+        conn.exec_driver_sql("INSERT INTO list_locations VALUES (1, 1, 1), (2, 1, 1)")
+
+    Base.metadata.create_all(legacy)
+    Base.metadata.create_all(legacy)
+
+    with legacy.connect() as conn:
+        assert conn.scalars(select(SchemaMigration.version).order_by(SchemaMigration.version)).all() == [1, 2, 3, 4, 5]
+        assert conn.scalars(select(ListLocation.id)).all() == [1]
+        assert conn.scalar(select(List.version)) == 1
+        assert conn.exec_driver_sql("SELECT id FROM locations_rtree").scalars().all() == [1]
+        assert conn.exec_driver_sql("SELECT rowid, owner, name FROM saved_places_fts").all() == [(1, 1, "p")]
+        indexes = {index["name"] for index in inspect(conn).get_indexes("list_locations")}
+        list_indexes = {index["name"] for index in inspect(conn).get_indexes("lists")}
+
+        new_list = List.__table__.insert().values(user_id=1, name="New", is_default=False)
+        deleted_id = conn.execute(new_list).inserted_primary_key[0]
+        conn.execute(List.__table__.delete().where(List.id == deleted_id))
+        list_id = conn.execute(new_list).inserted_primary_key[0]
+        link_id = conn.execute(ListLocation.__table__.insert().values(list_id=list_id, location_id=1)).inserted_primary_key[0]
+        # The search index trigger still finds the rebuilt lists table
+        owner = conn.exec_driver_sql(f"SELECT owner FROM saved_places_fts WHERE rowid = {link_id}").scalar()
+    assert list_id != deleted_id
+    assert owner == 1
+    assert {"uq_list_locations_list_id_location_id", "ix_list_locations_location_id_list_id"} <= indexes
+    assert {"ix_lists_id", "ix_lists_user_id"} <= list_indexes
+    legacy.dispose()
+
+def test_lifespan_creates_schema_and_warms_pool(tmp_path, monkeypatch):
+    fresh = create_db_engine(f"sqlite:///{tmp_path / 'startup.db'}")
+    monkeypatch.setattr(main, "engine", fresh)
+    monkeypatch.setattr(main, "async_engine", None)
+
+    with TestClient(main.app):
+        assert fresh.pool.checkedin() == DB_POOL_SIZE
+        with fresh.connect() as conn:
+            assert conn.scalar(select(func.count()).select_from(SchemaMigration)) == len(MIGRATIONS)
+
+def test_importing_app_does_not_touch_the_database(tmp_path):
+    url = f"sqlite:///{tmp_path / 'untouched.db'}"
+    subprocess.run(
+        [sys.executable, "-c", "import app.main"],
+        env={**os.environ, "DATABASE_URL": url}, check=True, cwd=os.path.dirname(os.path.dirname(__file__)),
+    )
+
+    assert not (tmp_path / "untouched.db").exists()
+
+def test_schema_creation_is_safe_from_concurrent_workers(tmp_path):
+    url = f"sqlite:///{tmp_path / 'workers.db'}"
+    script = "from app.database import engine; from app.models import create_schema; create_schema(engine)"
+    workers = [
+        subprocess.Popen([sys.executable, "-c", script], env={**os.environ, "DATABASE_URL": url},
+                         cwd=os.path.dirname(os.path.dirname(__file__)))
+        for _ in range(4)
+    ]
+
+    assert [w.wait() for w in workers] == [0, 0, 0, 0]
+    shared = create_engine(url)
+    with shared.connect() as conn:
+        assert conn.scalars(select(SchemaMigration.version)).all() == list(range(1, len(MIGRATIONS) + 1))
+    shared.dispose()
@@ -1,10 +1,9 @@
 import pytest
+from sqlalchemy import create_mock_engine
+from sqlalchemy.orm import Session
 from app.models import User, List
-
-def login_and_get_cookies(client, username="testuser", password="testpass"):
-    client.post("/auth/register", json={"username": username, "password": password})
-    resp = client.post("/auth/login", json={"username": username, "password": password})
-    return resp.cookies
+from app.routers.lists import ilike_search_stmt
+from tests.conftest import add_place, add_places, favorites_id, login_and_get_cookies
 
 def test_create_and_get_lists(client, db):
     cookies = login_and_get_cookies(client)
@@ -80,3 +79,228 @@ def test_delete_nonexistent_list(client):
 
     assert response.status_code == 404
     assert response.json()["detail"] == "List not found"
+
+def test_get_list_paginated(client):
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+    add_places(client, cookies, fav, 5)
+
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 2} if cursor is None else {"limit": 2, "cursor": cursor}
+        data = client.get(f"/lists/{fav}", params=params, cookies=cookies).json()
+        seen += [l["place_id"] for l in data["locations"]]
+        pages += 1
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert seen == [f"place{i}" for i in range(5)]
+
+def test_get_list_unpaginated_returns_everything(client):
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+    add_places(client, cookies, fav, 3)
+
+    data = client.get(f"/lists/{fav}", cookies=cookies).json()
+
+    assert [l["place_id"] for l in data["locations"]] == ["place0", "place1", "place2"]
+    assert data["next_cursor"] is None
+
+def test_get_list_streamed(client):
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+    add_places(client, cookies, fav, 3)
+
+    streamed = client.get(f"/lists/{fav}", params={"stream": True}, cookies=cookies)
+    regular = client.get(f"/lists/{fav}", cookies=cookies).json()
+
+    assert streamed.status_code == 200
+    data = streamed.json()
+    assert data["name"] == "Favorites"
+    assert data["locations"] == regular["locations"]
+
+def test_get_lists_etag(client):
+    cookies = login_and_get_cookies(client)
+    first = client.get("/lists", cookies=cookies)
+    etag = first.headers["etag"]
+
+    cached = client.get("/lists", headers={"If-None-Match": etag}, cookies=cookies)
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+
+    client.post("/lists", json={"name": "testlist1"}, cookies=cookies)
+    changed = client.get("/lists", headers={"If-None-Match": etag}, cookies=cookies)
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert len(changed.json()) == 3
+
+def test_get_list_etag_skips_location_query(client):
+    from sqlalchemy import event
+    from tests.conftest import engine
+
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+    add_places(client, cookies, fav, 2)
+    etag = client.get(f"/lists/{fav}", cookies=cookies).headers["etag"]
+
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.get(f"/lists/{fav}", headers={"If-None-Match": etag}, cookies=cookies)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert response.status_code == 304
+    assert not any("list_locations" in s for s in statements)
+
+def test_get_list_etag_changes_with_locations(client):
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+    etag = client.get(f"/lists/{fav}", cookies=cookies).headers["etag"]
+
+    add_places(client, cookies, fav, 1)
+    response = client.get(f"/lists/{fav}", headers={"If-None-Match": etag}, cookies=cookies)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    client.delete(f"/locations/{fav}/place0", cookies=cookies)
+    response = client.get(f"/lists/{fav}", headers={"If-None-Match": etag}, cookies=cookies)
+    assert response.status_code == 200
+    assert response.json()["locations"] == []
+
+def test_recreated_list_does_not_match_deleted_list_etag(client):
+    cookies = login_and_get_cookies(client)
+    old_id = client.post("/lists", json={"name": "trip"}, cookies=cookies).json()["id"]
+    etag = client.get(f"/lists/{old_id}", cookies=cookies).headers["etag"]
+    client.delete(f"/lists/{old_id}", cookies=cookies)
+
+    new_id = client.post("/lists", json={"name": "trip"}, cookies=cookies).json()["id"]
+    response = client.get(f"/lists/{new_id}", headers={"If-None-Match": etag}, cookies=cookies)
+
+    assert new_id != old_id
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+def test_get_list_sorted_by_distance(client):
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+    # place0 at 37.00, place1 at 37.01, ... place4 at 37.04
+    add_places(client, cookies, fav, 5)
+
+    response = client.get(f"/lists/{fav}", params={"lat": 37.035, "long": -122.0}, cookies=cookies)
+
+    assert response.status_code == 200
+    locations = response.json()["locations"]
+    assert [l["place_id"] for l in locations][:2] in (["place3", "place4"], ["place4", "place3"])
+    distances = [l["distance"] for l in locations]
+    assert distances == sorted(distances)
+    assert len(locations) == 5
+
+def test_get_list_distance_radius_and_limit(client):
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+    add_places(client, cookies, fav, 5)
+
+    # 0.01 degrees of latitude is about 1.1 km
+    params = {"lat": 37.0, "long": -122.0, "radius": 2500}
+    within = client.get(f"/lists/{fav}", params=params, cookies=cookies).json()["locations"]
+    nearest = client.get(f"/lists/{fav}", params={**params, "limit": 1}, cookies=cookies).json()["locations"]
+
+    assert [l["place_id"] for l in within] == ["place0", "place1", "place2"]
+    assert [l["place_id"] for l in nearest] == ["place0"]
+
+def test_get_list_distance_requires_full_origin(client):
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+
+    assert client.get(f"/lists/{fav}", params={"lat": 37.0}, cookies=cookies).status_code == 400
+    assert client.get(f"/lists/{fav}", params={"radius": 10}, cookies=cookies).status_code == 400
+
+def test_search_saved_places(client):
+    cookies = login_and_get_cookies(client)
+    lists = {l["name"]: l["id"] for l in client.get("/lists", cookies=cookies).json()}
+    ramen = {"name": "Ramen Nagi", "address": "3 Ramen Alley", "category": "catering.restaurant"}
+    add_place(client, cookies, lists["Favorites"], "r1", **ramen)
+    add_place(client, cookies, lists["Planned"], "r1", **ramen)
+    add_place(client, cookies, lists["Favorites"], "r2", name="Noodle Bar", address="12 Ramen Street", category="catering.restaurant")
+    add_place(client, cookies, lists["Favorites"], "c1", name="Blue Bottle", address="9 Mint Plaza")
+
+    other = login_and_get_cookies(client, "other", "otherpass")
+    other_favorites = favorites_id(client, other)
+    add_place(client, other, other_favorites, "r3", name="Ramen Shop")
+
+    response = client.get("/lists/search", params={"q": "ram"}, cookies=cookies)
+    assert response.status_code == 200
+    results = response.json()
+    # A name match outranks an address-only one, and other users' places never show up
+    assert [r["place_id"] for r in results] == ["r1", "r2"]
+    assert results[0]["list_ids"] == sorted([lists["Favorites"], lists["Planned"]])
+
+    assert [r["place_id"] for r in client.get("/lists/search", params={"q": "RAMEN nag"}, cookies=cookies).json()] == ["r1"]
+    assert [r["place_id"] for r in client.get("/lists/search", params={"q": "cafe"}, cookies=cookies).json()] == ["c1"]
+    assert client.get("/lists/search", params={"q": "ramen", "limit": 1}, cookies=cookies).json()[0]["place_id"] == "r1"
+    # Only the word being typed is a prefix
+    assert client.get("/lists/search", params={"q": "ram nagi"}, cookies=cookies).json() == []
+    assert client.get("/lists/search", params={"q": "nag "}, cookies=cookies).json() == []
+
+def test_search_saved_places_follows_list_changes(client):
+    cookies = login_and_get_cookies(client)
+    list_id = client.post("/lists", json={"name": "Trip"}, cookies=cookies).json()["id"]
+    add_place(client, cookies, list_id, "r1", name="Ramen Nagi")
+    add_place(client, cookies, list_id, "r2", name="Ramen Shop")
+
+    client.delete(f"/locations/{list_id}/r1", cookies=cookies)
+    assert [r["place_id"] for r in client.get("/lists/search", params={"q": "ramen"}, cookies=cookies).json()] == ["r2"]
+
+    client.delete(f"/lists/{list_id}", cookies=cookies)
+    assert client.get("/lists/search", params={"q": "ramen"}, cookies=cookies).json() == []
+
+def test_search_saved_places_numbers_do_not_match_owner(client):
+    cookies = login_and_get_cookies(client)
+    user_id = client.get("/auth/me", cookies=cookies).json()["id"]
+    fav = favorites_id(client, cookies)
+    add_place(client, cookies, fav, "r1", name="Ramen Nagi", address="3 Ramen Alley")
+    add_place(client, cookies, fav, "c1", name="Blue Bottle", address="42 Main St")
+
+    assert client.get("/lists/search", params={"q": f"{user_id} "}, cookies=cookies).json() == []
+    assert [p["place_id"] for p in client.get("/lists/search", params={"q": "42"}, cookies=cookies).json()] == ["c1"]
+
+def test_search_fallback_without_fts(client, db):
+    cookies = login_and_get_cookies(client)
+    user_id = client.get("/auth/me", cookies=cookies).json()["id"]
+    lists = {l["name"]: l["id"] for l in client.get("/lists", cookies=cookies).json()}
+    add_place(client, cookies, lists["Favorites"], "r1", name="Ramen Nagi", address="3 Ramen Alley")
+    add_place(client, cookies, lists["Planned"], "r1", name="Ramen Nagi", address="3 Ramen Alley")
+    add_place(client, cookies, lists["Planned"], "c1", name="Blue Bottle", address="42 Main St")
+
+    rows = db.execute(ilike_search_stmt(db, user_id, "ramen alley")).all()
+    assert [(loc.place_id, sorted(map(int, ids.split(",")))) for loc, ids in rows] == [
+        ("r1", sorted(lists.values()))
+    ]
+    # No words means no matches, not every saved place
+    assert ilike_search_stmt(db, user_id, "!!") is None
+    # "_" is literal: unescaped, "e_b" would match "Blue Bottle"
+    assert db.execute(ilike_search_stmt(db, user_id, "e_b")).all() == []
+
+    postgres = Session(bind=create_mock_engine("postgresql://", None))
+    sql = str(ilike_search_stmt(postgres, user_id, "ramen").compile(dialect=postgres.get_bind().dialect))
+    assert "string_agg" in sql
+    assert "group_concat" not in sql
+
+def test_search_saved_places_treats_query_syntax_literally(client):
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+    add_place(client, cookies, fav, "r1", name="Ramen Nagi")
+
+    for q in ['"ramen', "ramen OR", "NEAR(ramen)", "owner:2", "*", "-"]:
+        response = client.get("/lists/search", params={"q": q}, cookies=cookies)
+        assert response.status_code == 200, q
+    assert client.get("/lists/search", params={"q": "*"}, cookies=cookies).json() == []
+    client.cookies.clear()
+    assert client.get("/lists/search", params={"q": "ramen"}).status_code == 401
@@ -1,10 +1,9 @@
 import pytest
+from sqlalchemy import create_mock_engine, select
+from sqlalchemy.orm import Session
 from app.models import User, List, Location, ListLocation
-
-def login_and_get_cookies(client, username="testuser", password="testpass"):
-    client.post("/auth/register", json={"username": username, "password": password})
-    resp = client.post("/auth/login", json={"username": username, "password": password})
-    return resp.cookies
+from app.routers.lists import list_ids_agg
+from tests.conftest import add_place, favorites_id, login_and_get_cookies, place_payload
 
 def test_add_location(client, db):
     cookies = login_and_get_cookies(client)
@@ -52,7 +51,7 @@ def test_add_existing_location(client, db):
 
 def test_remove_location(client, db):
     cookies = login_and_get_cookies(client)
-    favorites_id = next(l for l in client.get("/lists", cookies=cookies).json() if l["name"] == "Favorites")["id"]
+    fav = favorites_id(client, cookies)
 
     location_data = {
         "name": "Test Location",
@@ -63,16 +62,16 @@ def test_remove_location(client, db):
         "category": "restaurant"
     }
 
-    client.post(f"/locations/{favorites_id}", json=location_data, cookies=cookies)
-    response = client.delete(f"/locations/{favorites_id}/test123", cookies=cookies)
+    client.post(f"/locations/{fav}", json=location_data, cookies=cookies)
+    response = client.delete(f"/locations/{fav}/test123", cookies=cookies)
 
     assert response.status_code == 200
     assert response.json()["message"] == "Location removed"
 
 def test_remove_nonexistent_location(client, db):
     cookies = login_and_get_cookies(client)
-    favorites_id = next(l for l in client.get("/lists", cookies=cookies).json() if l["name"] == "Favorites")["id"]
-    response = client.delete(f"/locations/{favorites_id}/nonexistent", cookies=cookies)
+    fav = favorites_id(client, cookies)
+    response = client.delete(f"/locations/{fav}/nonexistent", cookies=cookies)
 
     assert response.status_code == 404
     assert response.json()["detail"] in ["Location not found", "Location not in list"]
@@ -109,3 +108,205 @@ def test_check_location(client, db):
     assert results_dict["Favorites"]["added"] is True
     assert results_dict["Planned"]["added"] is False
     assert results_dict["testlist1"]["added"] is True
+
+def test_locations_within_bbox(client, db):
+    cookies = login_and_get_cookies(client)
+    lists = client.get("/lists", cookies=cookies).json()
+    favorites_id = next(l["id"] for l in lists if l["name"] == "Favorites")
+    planned_id = next(l["id"] for l in lists if l["name"] == "Planned")
+
+    add_place(client, cookies, favorites_id, "inside", latitude=37.7749, longitude=-122.4194)
+    add_place(client, cookies, planned_id, "inside", latitude=37.7749, longitude=-122.4194)
+    add_place(client, cookies, favorites_id, "outside", latitude=40.7128, longitude=-74.0060)
+
+    # Another user's place in the same box must not leak
+    other = login_and_get_cookies(client, username="otheruser")
+    other_lists = client.get("/lists", cookies=other).json()
+    add_place(client, other, other_lists[0]["id"], "theirs", latitude=37.775, longitude=-122.419)
+
+    response = client.get("/locations/within", params={
+        "south": 37.7, "west": -122.5, "north": 37.8, "east": -122.3
+    }, cookies=cookies)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [l["place_id"] for l in data] == ["inside"]
+    assert data[0]["list_ids"] == sorted([favorites_id, planned_id])
+
+def test_list_ids_agg_uses_string_agg_on_postgres():
+    # Postgres has no group_concat
+    session = Session(bind=create_mock_engine("postgresql://", None))
+    sql = str(select(list_ids_agg(session, List.id)).compile(dialect=session.get_bind().dialect))
+
+    assert "string_agg(CAST(lists.id AS VARCHAR)" in sql
+    assert "group_concat" not in sql
+
+def test_locations_within_invalid_bbox(client):
+    cookies = login_and_get_cookies(client)
+    response = client.get("/locations/within", params={
+        "south": 38, "west": -122.5, "north": 37, "east": -122.3
+    }, cookies=cookies)
+
+    assert response.status_code == 400
+
+def test_locations_nearby_sorted_by_distance(client, db):
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+
+    add_place(client, cookies, fav, "far", latitude=37.7800, longitude=-122.4194)
+    add_place(client, cookies, fav, "near", latitude=37.7750, longitude=-122.4194)
+    add_place(client, cookies, fav, "toofar", latitude=37.9000, longitude=-122.4194)
+
+    response = client.get("/locations/nearby", params={"lat": 37.7749, "long": -122.4194, "radius": 1000}, cookies=cookies)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [l["place_id"] for l in data] == ["near", "far"]
+    assert data[0]["distance"] < data[1]["distance"] <= 1000
+
+def test_check_locations_batch(client, db):
+    cookies = login_and_get_cookies(client)
+    lists = client.get("/lists", cookies=cookies).json()
+    favorites_id = next(l["id"] for l in lists if l["name"] == "Favorites")
+    planned_id = next(l["id"] for l in lists if l["name"] == "Planned")
+
+    add_place(client, cookies, favorites_id, "a", latitude=1.0, longitude=1.0)
+    add_place(client, cookies, planned_id, "b", latitude=2.0, longitude=2.0)
+
+    response = client.post("/locations/check-locations", json={"place_ids": ["a", "b", "unsaved"]}, cookies=cookies)
+
+    assert response.status_code == 200
+    data = response.json()
+    added = {pid: {r["name"] for r in rows if r["added"]} for pid, rows in data.items()}
+    assert added == {"a": {"Favorites"}, "b": {"Planned"}, "unsaved": set()}
+    assert all(len(rows) == 2 for rows in data.values())
+
+def test_check_locations_requires_place_ids(client):
+    cookies = login_and_get_cookies(client)
+    response = client.post("/locations/check-locations", json={"place_ids": []}, cookies=cookies)
+
+    assert response.status_code == 422
+
+def test_bulk_add_locations(client, db):
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+    add_place(client, cookies, fav, "existing", latitude=1.0, longitude=2.0)
+
+    payload = [place_payload(p) for p in ["a", "b", "a", "existing"]]
+    response = client.post(f"/locations/{fav}/bulk", json=payload, cookies=cookies)
+
+    assert response.status_code == 200
+    statuses = [(r["place_id"], r["status"]) for r in response.json()["results"]]
+    assert statuses == [("a", "added"), ("b", "added"), ("a", "duplicate"), ("existing", "already_in_list")]
+
+    data = client.get(f"/lists/{fav}", cookies=cookies).json()
+    assert [l["place_id"] for l in data["locations"]] == ["existing", "a", "b"]
+    assert db.query(Location).count() == 3
+
+def test_bulk_add_reuses_locations_across_lists(client, db):
+    cookies = login_and_get_cookies(client)
+    lists = client.get("/lists", cookies=cookies).json()
+    favorites_id = next(l["id"] for l in lists if l["name"] == "Favorites")
+    planned_id = next(l["id"] for l in lists if l["name"] == "Planned")
+
+    client.post(f"/locations/{favorites_id}/bulk", json=[place_payload("a")], cookies=cookies)
+    response = client.post(f"/locations/{planned_id}/bulk", json=[place_payload("a")], cookies=cookies)
+
+    assert response.json()["results"] == [{"place_id": "a", "status": "added"}]
+    assert db.query(Location).count() == 1
+    assert db.query(ListLocation).count() == 2
+
+def test_bulk_add_requires_category(client, db):
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+
+    uncategorized = {k: v for k, v in place_payload("b").items() if k != "category"}
+    response = client.post(f"/locations/{fav}/bulk", json=[place_payload("a"), uncategorized], cookies=cookies)
+
+    assert response.status_code == 422
+    assert db.query(Location).count() == 0
+
+def test_bulk_add_to_missing_list(client):
+    cookies = login_and_get_cookies(client)
+    response = client.post("/locations/9999/bulk", json=[place_payload("a")], cookies=cookies)
+
+    assert response.status_code == 404
+
+def test_bulk_remove_locations(client, db):
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+    client.post(f"/locations/{fav}/bulk", json=[place_payload(p) for p in ["a", "b", "c"]], cookies=cookies)
+
+    response = client.post(f"/locations/{fav}/bulk-remove", json={"place_ids": ["a", "c", "missing"]}, cookies=cookies)
+
+    assert response.status_code == 200
+    assert response.json()["results"] == [
+        {"place_id": "a", "status": "removed"},
+        {"place_id": "c", "status": "removed"},
+        {"place_id": "missing", "status": "not_in_list"},
+    ]
+    data = client.get(f"/lists/{fav}", cookies=cookies).json()
+    assert [l["place_id"] for l in data["locations"]] == ["b"]
+
+WORLD = {"south": -80, "west": -179, "north": 80, "east": 179}
+
+def test_location_clusters(client):
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+    add_place(client, cookies, fav, "sf1", latitude=37.7749, longitude=-122.4194)
+    add_place(client, cookies, fav, "sf2", latitude=37.7750, longitude=-122.4180)
+    add_place(client, cookies, fav, "sf3", latitude=37.7760, longitude=-122.4170)
+    add_place(client, cookies, fav, "nyc", latitude=40.7128, longitude=-74.0060)
+
+    response = client.get("/locations/clusters", params={**WORLD, "zoom": 2}, cookies=cookies)
+
+    assert response.status_code == 200
+    clusters = sorted(response.json(), key=lambda c: c["count"])
+    assert [c["count"] for c in clusters] == [1, 3]
+    assert clusters[0]["place"]["place_id"] == "nyc"
+    assert clusters[1]["place"]["place_id"] in {"sf1", "sf2", "sf3"}
+    assert abs(clusters[1]["latitude"] - 37.7753) < 0.001
+
+    # Zoomed in far enough, the San Francisco points separate
+    response = client.get("/locations/clusters", params={
+        "south": 37.774, "west": -122.420, "north": 37.777, "east": -122.416, "zoom": 18
+    }, cookies=cookies)
+    assert sum(c["count"] for c in response.json()) == 3
+    assert len(response.json()) == 3
+
+def test_location_clusters_cache_tracks_list_version(client):
+    from app.routers.locations import cluster_cache
+
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+    add_place(client, cookies, fav, "a", latitude=10.0, longitude=10.0)
+    params = {**WORLD, "zoom": 1, "list_id": fav}
+
+    client.get("/locations/clusters", params=params, cookies=cookies)
+    hits = cluster_cache.hits
+    assert client.get("/locations/clusters", params=params, cookies=cookies).json()[0]["count"] == 1
+    assert cluster_cache.hits > hits
+
+    add_place(client, cookies, fav, "b", latitude=10.1, longitude=10.1)
+    assert client.get("/locations/clusters", params=params, cookies=cookies).json()[0]["count"] == 2
+
+def test_location_clusters_not_shared_with_deleted_list(client):
+    cookies = login_and_get_cookies(client)
+    old_id = client.post("/lists", json={"name": "trip"}, cookies=cookies).json()["id"]
+    add_place(client, cookies, old_id, "a", latitude=10.0, longitude=10.0)
+    assert client.get("/locations/clusters", params={**WORLD, "zoom": 1, "list_id": old_id}, cookies=cookies).json()
+    client.delete(f"/lists/{old_id}", cookies=cookies)
+
+    # Same version as the deleted list had
+    new_id = client.post("/lists", json={"name": "trip"}, cookies=cookies).json()["id"]
+    add_place(client, cookies, new_id, "b", latitude=-40.0, longitude=-40.0)
+    response = client.get("/locations/clusters", params={**WORLD, "zoom": 1, "list_id": new_id}, cookies=cookies)
+
+    assert response.status_code == 200
+    assert [c["place"]["place_id"] for c in response.json()] == ["b"]
+
+def test_location_clusters_rejects_huge_tile_ranges(client):
+    cookies = login_and_get_cookies(client)
+    response = client.get("/locations/clusters", params={**WORLD, "zoom": 10}, cookies=cookies)
+
+    assert response.status_code == 400
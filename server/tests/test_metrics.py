@@ -0,0 +1,57 @@
+from app.core import metrics
+from app.core.metrics import Histogram, REGISTRY
+from tests.conftest import login_and_get_cookies
+
+def test_requests_recorded_per_route_template(client):
+    cookies = login_and_get_cookies(client)
+    lists = client.get("/lists", cookies=cookies).json()
+    before = metrics.http_latency.count("GET", "/lists/{list_id}")
+
+    for item in lists:
+        client.get(f"/lists/{item['id']}", cookies=cookies)
+
+    assert metrics.http_latency.count("GET", "/lists/{list_id}") == before + len(lists)
+    assert metrics.http_requests.value("GET", "/lists/{list_id}", "200") >= len(lists)
+    assert metrics.http_in_flight.value("GET") == 0
+
+def test_db_queries_counted_per_request(client):
+    cookies = login_and_get_cookies(client)
+    queries_before = metrics.db_queries.value()
+    requests_before = metrics.request_queries.count("GET", "/lists")
+
+    client.get("/lists", cookies=cookies)
+
+    assert metrics.db_queries.value() > queries_before
+    assert metrics.request_queries.count("GET", "/lists") == requests_before + 1
+    # At least the lists query itself
+    assert metrics.request_queries.sum("GET", "/lists") >= 1
+
+def test_unknown_paths_share_one_label(client):
+    client.get("/no/such/path")
+
+    assert metrics.http_requests.value("GET", "unmatched", "404") >= 1
+
+def test_metrics_endpoint_exports_prometheus_text(client):
+    client.get("/lists")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
+    assert 'http_requests_total{method="GET",route="/lists",status="401"}' in response.text
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    REGISTRY.remove(histogram)
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.1, "/a")
+    histogram.observe(5, "/a")
+
+    lines = histogram.render()
+
+    assert 'test_seconds_bucket{route="/a",le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{route="/a",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{route="/a"} 3' in lines
+    assert histogram.sum("/a") == 5.15
+    assert histogram.sum("/b") == 0
@@ -0,0 +1,140 @@
+import asyncio
+import time
+import pytest
+from fastapi import HTTPException
+from contextlib import asynccontextmanager
+from app.database import session_dependency
+from app.models import PlaceDetails
+from app.utils import geoapify, place_details
+from tests.conftest import TestingSessionLocal, favorites_id, login_and_get_cookies, place_payload
+
+def details_for(place_id):
+    return {"opening_hours": "Mo-Fr 08:00-18:00", "website": f"https://{place_id}.example", "phone": None,
+            "email": None, "categories": ["catering.cafe"]}
+
+@pytest.fixture
+def details_upstream(monkeypatch):
+    calls = []
+    async def fetch(place_id):
+        calls.append(place_id)
+        if place_id.startswith("missing"):
+            raise HTTPException(status_code=500, detail="Failed to fetch data")
+        if place_id.startswith("empty"):
+            return {}
+        return details_for(place_id)
+    monkeypatch.setattr(place_details, "fetch_place_details", fetch)
+    return calls
+
+def store(db, place_id, data, age):
+    db.merge(PlaceDetails(place_id=place_id, data=data, fetched_at=time.time() - age))
+    db.commit()
+
+def test_parse_details_prefers_the_place_feature():
+    data = {"features": [
+        {"properties": {"feature_type": "building", "website": "https://building.example"}},
+        {"properties": {"feature_type": "details", "website": "https://cafe.example", "opening_hours": "24/7",
+                        "contact": {"phone": "+1 555"}, "categories": ["catering.cafe"]}},
+    ]}
+    assert geoapify.parse_details(data) == {
+        "opening_hours": "24/7", "website": "https://cafe.example", "phone": "+1 555", "email": None,
+        "categories": ["catering.cafe"],
+    }
+    assert geoapify.parse_details({"features": []}) == {}
+
+def test_details_are_fetched_once_and_stored(client, details_upstream, db):
+    cookies = login_and_get_cookies(client)
+    body = {"place_ids": ["a", "b", "a"]}
+    response = client.post("/places/details", json=body, cookies=cookies)
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["place_id"] for r in results] == ["a", "b"]
+    assert results[0]["details"]["website"] == "https://a.example"
+    assert sorted(details_upstream) == ["a", "b"]
+
+    client.post("/places/details", json=body, cookies=cookies)
+    assert len(details_upstream) == 2
+    assert db.query(PlaceDetails).count() == 2
+
+def test_stale_details_are_served_and_refreshed_in_background(client, details_upstream, db, monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(place_details.details_refresher, "schedule", lambda open_session, ids: scheduled.append(ids))
+    store(db, "a", {"website": "https://old.example"}, age=place_details.PLACE_DETAILS_TTL + 60)
+    cookies = login_and_get_cookies(client)
+
+    response = client.get("/places/a/details", cookies=cookies)
+    assert response.json()["details"]["website"] == "https://old.example"
+    assert details_upstream == []
+    assert scheduled == [["a"]]
+
+def test_too_stale_details_are_refetched(client, details_upstream, db):
+    store(db, "a", {"website": "https://old.example"},
+          age=place_details.PLACE_DETAILS_TTL + place_details.PLACE_DETAILS_MAX_STALE + 60)
+    store(db, "missing1", {"website": "https://kept.example"},
+          age=place_details.PLACE_DETAILS_TTL + place_details.PLACE_DETAILS_MAX_STALE + 60)
+    cookies = login_and_get_cookies(client)
+
+    results = client.post("/places/details", json={"place_ids": ["a", "missing1"]}, cookies=cookies).json()["results"]
+    assert results[0]["details"]["website"] == "https://a.example"
+    # A failed refetch falls back to the old copy
+    assert results[1]["details"]["website"] == "https://kept.example"
+
+def test_failed_fetch_without_stored_copy_502(client, details_upstream):
+    cookies = login_and_get_cookies(client)
+    assert client.get("/places/missing1/details", cookies=cookies).status_code == 502
+    client.cookies.clear()
+    assert client.get("/places/a/details").status_code == 401
+
+def test_place_without_details_404(client, details_upstream):
+    cookies = login_and_get_cookies(client)
+    assert client.get("/places/empty1/details", cookies=cookies).status_code == 404
+
+def test_refresher_stores_fresh_details(client, details_upstream, db):
+    store(db, "a", {"website": "https://old.example"}, age=place_details.PLACE_DETAILS_TTL + 60)
+    refresher = place_details.DetailsRefresher()
+    open_session = asynccontextmanager(session_dependency(TestingSessionLocal))
+
+    async def refresh():
+        refresher.schedule(open_session, ["a", "missing1"])
+        # Already in flight, so not scheduled twice
+        refresher.schedule(open_session, ["a"])
+        await refresher.join()
+
+    asyncio.run(refresh())
+    db.expire_all()
+    assert db.get(PlaceDetails, "a").data["website"] == "https://a.example"
+    assert details_upstream == ["a", "missing1"]
+    assert refresher.stats() == {"pending": 0, "refreshing": 0, "refreshed": 1}
+
+def test_batch_concurrency_is_bounded(monkeypatch):
+    running = peak = 0
+    async def fetch(place_id):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.001)
+        running -= 1
+        return {}
+    monkeypatch.setattr(place_details, "fetch_place_details", fetch)
+    monkeypatch.setattr(place_details, "PLACE_DETAILS_CONCURRENCY", 3)
+
+    fetched = asyncio.run(place_details.fetch_details_batch([f"p{i}" for i in range(20)]))
+    assert len(fetched) == 20
+    assert peak == 3
+
+def test_get_list_with_details(client, details_upstream):
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+    client.post(f"/locations/{fav}/bulk", json=[place_payload(p) for p in ("a", "missing1")], cookies=cookies)
+
+    response = client.get(f"/lists/{fav}", params={"details": "true"}, cookies=cookies)
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+    locations = response.json()["locations"]
+    assert locations[0]["details"]["website"] == "https://a.example"
+    assert locations[1]["details"] is None
+
+    plain = client.get(f"/lists/{fav}", cookies=cookies).json()
+    assert "details" not in plain["locations"][0]
+
+    response = client.get(f"/lists/{fav}", params={"details": "true", "stream": "true"}, cookies=cookies)
+    assert response.status_code == 400
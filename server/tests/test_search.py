@@ -0,0 +1,196 @@
+import asyncio
+import pytest
+from app.core import metrics
+from app.routers import search as search_router
+from app.utils import geoapify
+from app.utils.prefetch import SearchPrefetcher
+from app.utils.cache import TTLCache, SQLiteCache, TieredCache, LatestOnly, Superseded
+
+def test_search_returns_results(client, upstream):
+    response = client.get("/searchQuery", params={"query": "cafe", "lat": "40.0", "long": "-74.0"})
+
+    assert response.status_code == 200
+    assert response.json()["results"][0]["place_id"] == "cafe1"
+    assert len(upstream) == 1
+
+def test_search_cache_shares_nearby_queries(client, upstream):
+    client.get("/searchQuery", params={"query": "Cafe", "lat": "40.0001", "long": "-74.0001"})
+    client.get("/searchQuery", params={"query": "  cafe ", "lat": "40.0002", "long": "-74.0002"})
+    client.get("/searchQuery", params={"query": "cafe", "lat": "41.0", "long": "-74.0"})
+
+    assert len(upstream) == 2
+    stats = client.get("/searchQuery/cache-stats").json()
+    assert stats["memory"]["hits"] == 1
+    assert stats["memory"]["misses"] == 2
+
+def test_concurrent_identical_searches_coalesce(upstream):
+    async def burst():
+        return await asyncio.gather(*[
+            geoapify.search_query("cafe", "40.0", "-74.0", 50) for _ in range(10)
+        ])
+
+    results = asyncio.run(burst())
+
+    assert len(upstream) == 1
+    assert all(r == results[0] for r in results)
+    assert len(geoapify.search_flight) == 0
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.evictions == 1
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(maxsize=2, ttl=0)
+    cache.set("a", 1)
+
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+
+def test_ttl_cache_peek_leaves_counters_and_order():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    assert cache.peek("a") == 1
+    assert cache.peek("missing") is None
+    assert (cache.hits, cache.misses) == (0, 0)
+    # "a" is still least recently used
+    cache.set("c", 3)
+    assert cache.peek("a") is None
+
+    cache.set("d", 4, ttl=0)
+    assert cache.peek("d") is None
+
+def test_sqlite_tier_survives_new_memory_tier(tmp_path):
+    path = str(tmp_path / "cache.db")
+    TieredCache(TTLCache(8, 60), SQLiteCache(path, 60)).set("k", [{"name": "x"}])
+
+    fresh = TieredCache(TTLCache(8, 60), SQLiteCache(path, 60))
+    assert fresh.get("k") == [{"name": "x"}]
+    assert fresh.memory.get("k") == [{"name": "x"}]
+
+def test_tiered_peek_counts_nothing_and_does_not_promote(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "cache.db"), 60)
+    disk.set("k", [1])
+    disk.set("old", [2], ttl=0)
+    cache = TieredCache(TTLCache(8, 60), disk)
+
+    assert cache.peek("k") == [1]
+    assert asyncio.run(cache.apeek("k")) == [1]
+    assert cache.peek("old") is None
+    assert cache.peek("missing") is None
+    assert len(cache.memory) == 0
+    assert cache.stats()["memory"]["misses"] == cache.stats()["disk"]["misses"] == 0
+
+def test_warm_prunes_expired_disk_entries(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "cache.db"), 60)
+    disk.set("old", 1, ttl=0)
+    disk.set("new", 2)
+
+    assert TieredCache(TTLCache(8, 60), disk).warm() == 1
+    assert disk.stats()["size"] == 1
+    assert disk.expirations == 1
+
+def test_upstream_latency_recorded_by_status(client, upstream):
+    before = metrics.upstream_latency.count("geocode/search", "200")
+
+    client.get("/searchQuery", params={"query": "museum", "lat": "40.0", "long": "-74.0"})
+
+    assert metrics.upstream_latency.count("geocode/search", "200") == before + 1
+
+def test_autocomplete_filters_complete_shorter_prefix(client, upstream):
+    first = client.get("/autocomplete", params={"text": "Test", "lat": "40.0", "long": "-74.0"})
+    longer = client.get("/autocomplete", params={"text": "test ca", "lat": "40.01", "long": "-74.0"})
+    other = client.get("/autocomplete", params={"text": "testx", "lat": "40.0", "long": "-74.0"})
+
+    assert first.json()["results"][0]["place_id"] == "cafe1"
+    assert longer.json()["results"][0]["place_id"] == "cafe1"
+    assert other.json()["results"] == []
+    assert len(upstream) == 1
+    # One miss per request; probing the shorter prefixes isn't counted
+    assert geoapify.autocomplete_cache.misses == 3
+    assert upstream[0]["limit"] == geoapify.AUTOCOMPLETE_LIMIT
+
+def test_autocomplete_refetches_when_shorter_prefix_was_truncated(client, upstream, monkeypatch):
+    # One result at limit 1 means more may have been cut off
+    monkeypatch.setattr(geoapify, "AUTOCOMPLETE_LIMIT", 1)
+
+    client.get("/autocomplete", params={"text": "tes", "lat": "40.0", "long": "-74.0"})
+    client.get("/autocomplete", params={"text": "test", "lat": "40.0", "long": "-74.0"})
+
+    assert len(upstream) == 2
+
+def test_latest_only_cancels_superseded_call():
+    cancelled = []
+
+    async def slow(value):
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(value)
+            raise
+        return value
+
+    async def fast(value):
+        return value
+
+    async def typing():
+        latest = LatestOnly()
+        stale = asyncio.ensure_future(latest.run("client", slow, "ca"))
+        await asyncio.sleep(0.01)
+        fresh = await latest.run("client", fast, "caf")
+        with pytest.raises(Superseded):
+            await stale
+        return fresh, len(latest)
+
+    assert asyncio.run(typing()) == ("caf", 0)
+    assert cancelled == ["ca"]
+
+def test_prefetch_warms_neighbouring_cells(upstream):
+    prefetcher = SearchPrefetcher(client_budget=100, global_budget=100, concurrency=4)
+
+    async def pan():
+        await geoapify.search_query("cafe", "40.0", "-74.0", 50)
+        prefetcher.schedule("client", "cafe", "40.0", "-74.0", 50)
+        await prefetcher.join()
+        # One cell east, after a pan
+        return await geoapify.search_query("cafe", "40.0", "-73.99", 50)
+
+    results = asyncio.run(pan())
+
+    assert results[0]["place_id"] == "cafe1"
+    assert len(upstream) == 9
+    assert prefetcher.stats() == {"pending": 0, "fetched": 8, "skipped": 0}
+    # Probing and prefetching count nothing: one miss for the first search, one hit after the pan
+    assert (geoapify.search_cache.memory.misses, geoapify.search_cache.memory.hits) == (1, 1)
+
+def test_prefetch_respects_client_and_global_budgets(upstream):
+    prefetcher = SearchPrefetcher(client_budget=3, global_budget=5, concurrency=4)
+
+    async def burst():
+        prefetcher.schedule("a", "cafe", "40.0", "-74.0", 50)
+        await prefetcher.join()
+        prefetcher.schedule("b", "pizza", "41.0", "-74.0", 50)
+        await prefetcher.join()
+
+    asyncio.run(burst())
+
+    # a spends its 3, b is cut off by the global 5
+    assert len(upstream) == 5
+    assert prefetcher.stats()["skipped"] == 11
+
+def test_search_schedules_prefetch_when_enabled(client, upstream, monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(search_router, "SEARCH_PREFETCH", True)
+    monkeypatch.setattr(search_router.search_prefetcher, "schedule", lambda *args: scheduled.append(args))
+
+    client.get("/searchQuery", params={"query": "cafe", "lat": "40.0", "long": "-74.0"}, headers={"X-Client-Id": "tab1"})
+
+    assert scheduled == [("tab1", "cafe", "40.0", "-74.0", 50)]
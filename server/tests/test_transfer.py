@@ -0,0 +1,128 @@
+import csv
+import io
+import json
+import pytest
+from app.utils.transfer import iter_geojson_records
+from tests.conftest import favorites_id, login_and_get_cookies, place_payload
+
+def make_location(i):
+    return place_payload(
+        f"place{i}", name=f"Place {i}", address=f"{i} Main St", latitude=37.77 + i / 1000, longitude=-122.42 + i / 1000
+    )
+
+def test_export_geojson(client):
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+    client.post(f"/locations/{fav}/bulk", json=[make_location(i) for i in range(3)], cookies=cookies)
+
+    response = client.get("/lists/export", cookies=cookies)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/geo+json")
+    data = response.json()
+    assert data["type"] == "FeatureCollection"
+    assert [f["properties"]["place_id"] for f in data["features"]] == ["place0", "place1", "place2"]
+    assert data["features"][0]["geometry"] == {"type": "Point", "coordinates": [-122.42, 37.77]}
+    assert data["features"][0]["properties"]["list"] == "Favorites"
+
+def test_export_empty_and_single_list(client):
+    cookies = login_and_get_cookies(client)
+    assert client.get("/lists/export", cookies=cookies).json() == {"type": "FeatureCollection", "features": []}
+
+    fav = favorites_id(client, cookies)
+    client.post(f"/locations/{fav}/bulk", json=[make_location(1)], cookies=cookies)
+    response = client.get(f"/lists/{fav}/export?format=csv", cookies=cookies)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(r["list"], r["place_id"], r["latitude"]) for r in rows] == [("Favorites", "place1", "37.771")]
+
+    other = login_and_get_cookies(client, "other", "otherpass")
+    assert client.get(f"/lists/{fav}/export", cookies=other).status_code == 404
+
+def test_export_import_round_trip(client):
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+    client.post(f"/locations/{fav}/bulk", json=[make_location(i) for i in range(5)], cookies=cookies)
+    exported = client.get("/lists/export?format=csv", cookies=cookies).content
+
+    other = login_and_get_cookies(client, "other", "otherpass")
+    response = client.post("/lists/import", files={"file": ("lists.csv", exported, "text/csv")}, cookies=other)
+    assert response.status_code == 200
+    assert response.json()["added"] == 5
+    assert response.json()["lists_created"] == 0
+
+    other_fav = favorites_id(client, other)
+    assert len(client.get(f"/lists/{other_fav}", cookies=other).json()["locations"]) == 5
+
+    # Importing again adds nothing
+    again = client.post("/lists/import", files={"file": ("lists.csv", exported, "text/csv")}, cookies=other).json()
+    assert again["added"] == 0
+    assert again["already_in_list"] == 5
+
+def test_import_geojson_creates_lists_and_reports_invalid_rows(client):
+    cookies = login_and_get_cookies(client)
+    features = [
+        {"type": "Feature", "geometry": {"type": "Point", "coordinates": [2.35, 48.85]},
+         "properties": {**make_location(1), "list": "Paris"}},
+        {"type": "Feature", "geometry": {"type": "Point", "coordinates": [2.36, 48.86]},
+         "properties": {**make_location(2), "list": ""}},
+        {"type": "Feature", "geometry": None, "properties": {"name": "No coordinates", "place_id": "x"}},
+    ]
+    body = json.dumps({"type": "FeatureCollection", "features": features}).encode()
+    response = client.post("/lists/import", files={"file": ("places.geojson", body)}, cookies=cookies)
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["added"], result["invalid"], result["lists_created"]) == (2, 1, 2)
+    assert result["errors"][0].startswith("row 3:")
+
+    names = {l["name"] for l in client.get("/lists", cookies=cookies).json()}
+    assert {"Paris", "Imported"} <= names
+
+def test_import_into_list(client):
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+    body = json.dumps({"type": "FeatureCollection", "features": [
+        {"type": "Feature", "geometry": {"type": "Point", "coordinates": [1, 2]},
+         "properties": {**make_location(1), "list": "Elsewhere"}},
+    ]}).encode()
+    response = client.post(f"/lists/import?list_id={fav}", files={"file": ("places.json", body)}, cookies=cookies)
+    assert response.json()["added"] == 1
+    assert response.json()["lists_created"] == 0
+    assert client.get(f"/lists/{fav}", cookies=cookies).json()["locations"][0]["place_id"] == "place1"
+
+def test_import_row_without_category(client):
+    cookies = login_and_get_cookies(client)
+    fav = favorites_id(client, cookies)
+    rows = io.StringIO()
+    writer = csv.DictWriter(rows, fieldnames=["name", "address", "latitude", "longitude", "place_id", "category"])
+    writer.writeheader()
+    writer.writerow({**make_location(1), "category": ""})
+    writer.writerow(make_location(2))
+
+    response = client.post(f"/lists/import?list_id={fav}", files={"file": ("places.csv", rows.getvalue())}, cookies=cookies)
+
+    assert response.status_code == 200
+    assert (response.json()["added"], response.json()["invalid"]) == (2, 0)
+    locations = client.get(f"/lists/{fav}", cookies=cookies).json()["locations"]
+    assert [l["category"] for l in locations] == ["", "catering.cafe"]
+
+def test_import_rejects_bad_files(client):
+    cookies = login_and_get_cookies(client)
+    response = client.post("/lists/import", files={"file": ("places.txt", b"whatever")}, cookies=cookies)
+    assert response.status_code == 400
+    response = client.post("/lists/import", files={"file": ("places.geojson", b'{"features": [{"type": 1')}, cookies=cookies)
+    assert response.status_code == 400
+    response = client.post("/lists/import", files={"file": ("places.geojson", b'{"type": "Feature"}')}, cookies=cookies)
+    assert response.status_code == 400
+
+def test_iter_geojson_records_across_chunks():
+    features = [
+        {"type": "Feature", "geometry": {"type": "Point", "coordinates": [i, -i]}, "properties": {"name": f"é{i}"}}
+        for i in range(20)
+    ]
+    body = json.dumps({"type": "FeatureCollection", "features": features}, ensure_ascii=False).encode()
+    records = list(iter_geojson_records(io.BytesIO(body), chunk_size=7))
+    assert [(r["name"], r["longitude"], r["latitude"]) for r in records] == [(f"é{i}", i, -i) for i in range(20)]
+
+    with pytest.raises(ValueError):
+        list(iter_geojson_records(io.BytesIO(body[:-10]), chunk_size=7))